@@ -17,15 +17,55 @@ class Settings(BaseSettings):
     CHROMADB_HOST: str = "localhost"
     CHROMADB_PORT: int = 8000
     CHROMADB_COLLECTION: str = "policy_embeddings"
+    VECTOR_STORE: str = "chroma"  # 向量库实现：chroma / mmap（进程内内存映射矩阵）
+    VECTOR_STORE_PATH: str = "./data/policy_vectors.bin"  # mmap 向量库文件
     
     # DeepSeek API配置
     DEEPSEEK_API_KEY: str = "sk-e51ff57edcae48a2b5b462d9f8abcd49"
     DEEPSEEK_BASE_URL: str = "https://api.deepseek.com/v1"
     DEEPSEEK_MODEL: str = "deepseek-chat"
+    DEEPSEEK_CHAT_TIMEOUT: float = 60.0  # 聊天接口读取超时（秒）
+    DEEPSEEK_ANALYSIS_TIMEOUT: float = 30.0  # 匹配分析读取超时（秒）
+    
+    # 共享HTTP客户端连接池配置
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_CONNECT_TIMEOUT: float = 10.0
+    HTTP2_ENABLED: bool = True
     
     # BGE模型配置
     BGE_MODEL_NAME: str = "BAAI/bge-large-zh"
     BGE_MODEL_PATH: str = "./models/bge-large-zh"
+    EMBEDDING_BACKEND: str = "sentence-transformers"  # 向量推理后端：sentence-transformers / onnx / onnx-int8
+    EMBEDDING_ONNX_DIR: str = "./models/bge-large-zh-onnx"  # ONNX模型目录，首次使用ONNX后端时自动导出
+    EMBEDDING_MAX_LENGTH: int = 512  # ONNX后端的最大token数
+    EMBEDDING_THREADS: int = 0  # ONNX Runtime 推理线程数，0 为自动
+    EMBEDDING_BATCH_SIZE: int = 32  # 查询向量批量推理的最大条数
+    EMBEDDING_BATCH_WAIT: float = 0.005  # 凑批最长等待时间（秒）
+    EMBEDDING_QUEUE_SIZE: int = 1024  # 待推理队列长度上限，队列满时请求等待
+    EMBEDDING_CACHE_PATH: str = "./data/embedding_cache.db"  # 查询向量缓存文件（SQLite），为空时只缓存在内存
+    EMBEDDING_CACHE_SIZE: int = 4096  # 进程内缓存的查询向量数
+    EMBEDDING_CACHE_DTYPE: str = "float16"  # 缓存向量的存储精度（float16 / float32）
+    
+    # 匹配分析配置
+    MATCH_ANALYSIS_CONCURRENCY: int = 5  # 同时进行的DeepSeek分析请求数上限
+    MATCH_ANALYSIS_DEADLINE: float = 15.0  # 单次匹配请求的AI分析时限（秒），超时的政策使用规则分析
+    MATCH_ANALYSIS_BATCH_ENABLED: bool = False  # 多个政策合并为一次DeepSeek分析请求（组大小受分析时限限制）
+    MATCH_ANALYSIS_BATCH_TOKEN_BUDGET: int = 6000  # 每次批量请求的token预算（提示 + 预留输出）
+    MATCH_ANALYSIS_BATCH_MAX_POLICIES: int = 8  # 每次批量请求最多包含的政策数
+    MATCH_ANALYSIS_OUTPUT_TOKENS: int = 600  # 每个政策预留的输出token数
+    MATCH_ANALYSIS_OUTPUT_TOKENS_PER_SECOND: float = 40.0  # DeepSeek单个请求的输出速度估计，用于按时限确定批大小
+    MATCH_LLM_BUDGET: int = 5  # 每次匹配请求最多进行AI分析的政策数（可按请求覆盖）
+    MATCH_PRESCORE_MARGIN: float = 0.2  # AI分析可能高出规则预评分（地区、产业、认定命中加分，0-0.5）的幅度，用于淘汰无望达到 min_score 的候选
+    MATCH_DEGRADED_CANDIDATES: int = 50  # 模型预热期间参与规则评分的最近更新政策数
+    LEXICAL_INDEX_ENABLED: bool = True  # 关键词（BM25 字符二元组）召回，与向量召回融合
+    LEXICAL_INDEX_REFRESH_INTERVAL: float = 300.0  # 关键词索引增量同步间隔（秒）
+    LEXICAL_INDEX_RETRY_INTERVAL: float = 30.0  # 关键词索引首次同步失败后的重试间隔（秒）
+    HYBRID_RRF_K: int = 60  # 倒数排名融合常数
+    ANALYSIS_CACHE_PATH: str = "./data/analysis_cache.db"  # AI分析结果缓存（SQLite）
+    ANALYSIS_CACHE_SIZE: int = 2048  # 进程内缓存条数
+    ANALYSIS_CACHE_TTL: float = 7 * 24 * 3600  # 缓存有效期（秒）
     
     # Redis配置（用于Celery）
     REDIS_URL: str = "redis://localhost:6379/0"
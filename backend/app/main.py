@@ -1,19 +1,26 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, IO, Iterator
 import uvicorn
 from datetime import datetime, date
+from functools import lru_cache
 import json
+import csv
+import io
+import tempfile
+import hashlib
 import sqlite3
 import os
 from pathlib import Path
 import asyncio
 import time
 import httpx
+import numpy as np
 import logging
 
 # 导入AI聊天路由
@@ -25,6 +32,18 @@ except ImportError as e:
     AI_CHAT_AVAILABLE = False
     print(f"⚠️ AI聊天模块导入失败: {e}")
 
+from app.config import settings
+from app.services.http_client import shared_http_client
+from app.services.json_codec import FastJSONResponse, RawJSON, dumps, dumps_members, join_object
+from app.services.policy_snapshot import (
+    POLICY_MATCH_FIELDS, PolicySnapshot, build_snapshot, current_snapshot, load_snapshot,
+    open_snapshot, publish_snapshot, save_snapshot
+)
+from app.services.policy_stats import deadline_ordinal
+from app.services.profile_writer import ProfileWriter
+from app.services.rule_engine import build_match_table, select_top_k
+from app.services.snapshot_store import read_snapshot_source_hash
+
 # 创建FastAPI应用
 app = FastAPI(
     title="PolicyPilot API",
@@ -52,6 +71,37 @@ else:
 DEEPSEEK_API_KEY = "sk-e51ff57edcae48a2b5b462d9f8abcd49"
 DEEPSEEK_BASE_URL = "https://api.deepseek.com/v1"
 DEEPSEEK_MODEL = "deepseek-chat"
+DEEPSEEK_CHAT_TIMEOUT = float(os.getenv("DEEPSEEK_CHAT_TIMEOUT", "60.0"))
+
+# 共享HTTP客户端连接池配置（所有DeepSeek请求复用同一连接池）
+HTTP_CLIENT_OPTIONS = {
+    "max_connections": settings.HTTP_MAX_CONNECTIONS,
+    "max_keepalive_connections": settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    "keepalive_expiry": settings.HTTP_KEEPALIVE_EXPIRY,
+    "connect_timeout": settings.HTTP_CONNECT_TIMEOUT,
+    "http2": settings.HTTP2_ENABLED
+}
+
+# 预计算匹配表配置（可选模式：按画像组合查表返回匹配结果）
+MATCH_TABLE_ENABLED = os.getenv("MATCH_TABLE_ENABLED", "false").lower() == "true"
+MATCH_TABLE_TOP_K = int(os.getenv("MATCH_TABLE_TOP_K", "20"))
+MATCH_SCORE_THRESHOLD = 0.25
+# 单个企业最多返回的匹配数（超过匹配表的 k 时走实时打分）
+MATCH_MAX_TOP_K = 100
+
+# 政策数据文件：爬虫输出的JSON，以及由它编译出的二进制快照（启动时直接内存映射）
+CRAWL_DATA_PATH = "data/real_policies.json"
+POLICY_SNAPSHOT_PATH = os.getenv("POLICY_SNAPSHOT_PATH", "data/policies.snapshot")
+
+# 企业信息写入器配置（后台成批写入 data/companies.jsonl）
+profile_writer = ProfileWriter(
+    path="data/companies.jsonl",
+    max_queue_size=int(os.getenv("PROFILE_WRITER_QUEUE_SIZE", "10000")),
+    batch_size=int(os.getenv("PROFILE_WRITER_BATCH_SIZE", "200")),
+    flush_interval=float(os.getenv("PROFILE_WRITER_FLUSH_INTERVAL", "1.0")),
+    fsync_interval=float(os.getenv("PROFILE_WRITER_FSYNC_INTERVAL", "5.0")),
+    max_file_bytes=int(os.getenv("PROFILE_WRITER_MAX_FILE_MB", "50")) * 1024 * 1024
+)
 
 # AI聊天数据模型
 class ChatMessage(BaseModel):
@@ -98,56 +148,121 @@ class MatchResponse(BaseModel):
     message: str
     data: Dict[str, Any]
 
-# 全局政策数据库（动态更新）
-POLICIES_DATABASE = []
+# 政策数据以不可变快照形式发布（见 app.services.policy_snapshot），
+# 每个请求开始时通过 current_snapshot() 固定使用一份快照
 
 # 加载爬取的政策数据
-def load_crawled_policies():
-    """从爬虫数据文件加载政策"""
-    global POLICIES_DATABASE
+def read_crawled_policies() -> Optional[List[dict]]:
+    """从爬虫数据文件读取并转换政策，文件不存在或解析失败时返回None"""
+    if not os.path.exists(CRAWL_DATA_PATH):
+        return None
     
-    # 尝试从爬虫输出文件加载
-    crawl_data_path = "data/real_policies.json"
-    if os.path.exists(crawl_data_path):
+    try:
+        with open(CRAWL_DATA_PATH, 'r', encoding='utf-8') as f:
+            crawled_data = json.load(f)
+        
+        # 转换爬取数据为标准格式
+        converted_policies = []
+        for i, policy in enumerate(crawled_data):
+            converted_policy = {
+                "policy_id": policy.get("policy_id", f"CRAWL_{i+1:03d}"),
+                "policy_name": policy.get("title", "未知政策"),
+                "region": policy.get("region", "徐汇区"),
+                "support_type": policy.get("policy_type", "subsidy"),
+                "max_amount": policy.get("max_amount", 1000000),
+                "deadline": policy.get("publish_date", "2024-12-31"),
+                "industry_tags": policy.get("industry_tags", ["科技创新"]),
+                "source_url": policy.get("url", ""),
+                "requirements": policy.get("requirements", ["企业注册地在徐汇区", "符合相关条件"]),
+                "target_industries": ["ai", "tech"],
+                "target_scale": ["small", "medium", "large"],
+                "target_rd": ["medium", "high"],
+                "base_score": 0.75,
+                "application_period": "全年申报",
+                "approval_department": policy.get("department", "徐汇区相关部门"),
+                "content": policy.get("content", "")
+            }
+            converted_policies.append(converted_policy)
+        
+        print(f"✅ 成功加载 {len(converted_policies)} 条爬取的政策数据")
+        return converted_policies
+        
+    except Exception as e:
+        print(f"⚠️ 加载爬取数据失败: {e}")
+        return None
+
+def load_crawled_policies() -> List[dict]:
+    """读取完整的政策列表：优先爬取数据，失败时保留当前政策，仍为空则使用默认数据"""
+    policies = read_crawled_policies()
+    if policies is not None:
+        return policies
+    
+    current = current_snapshot()
+    if len(current):
+        # 快照中正文与列表字段分开保存，重建时重新合并
+        return [dict(policy, content=current.content(i)) for i, policy in enumerate(current.policies)]
+    
+    print("📋 使用默认政策数据")
+    return get_fallback_policies()
+
+def crawl_data_fingerprint() -> str:
+    """爬虫数据文件的内容哈希；文件不存在时返回固定标记（对应默认政策数据）"""
+    try:
+        with open(CRAWL_DATA_PATH, 'rb') as f:
+            return "sha256:" + hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return "fallback"
+
+def snapshot_file_is_fresh(source_hash: str) -> bool:
+    """二进制快照文件头部记录的源数据哈希与当前爬虫数据一致"""
+    return read_snapshot_source_hash(POLICY_SNAPSHOT_PATH) == source_hash
+
+def write_snapshot_file(snapshot: PolicySnapshot, source_hash: str):
+    """把快照写为二进制文件，写入失败不影响服务"""
+    try:
+        save_snapshot(snapshot, POLICY_SNAPSHOT_PATH, source_hash)
+    except Exception as e:
+        print(f"⚠️ 写入政策二进制快照失败: {e}")
+
+async def reload_policies(from_snapshot_file: bool = False) -> PolicySnapshot:
+    """
+    构建新政策快照并发布，随后按需在后台重建匹配表
+
+    from_snapshot_file=True 时（启动）优先内存映射最新的二进制快照文件；
+    否则（或文件过期、损坏）在线程池中解析JSON构建快照，并重写二进制文件。
+    """
+    snapshot = None
+    # 先于读取数据计算哈希：读取期间文件被替换时，下次启动会判定快照过期并重建
+    source_hash = await asyncio.to_thread(crawl_data_fingerprint)
+    if from_snapshot_file and snapshot_file_is_fresh(source_hash):
         try:
-            with open(crawl_data_path, 'r', encoding='utf-8') as f:
-                crawled_data = json.load(f)
-            
-            # 转换爬取数据为标准格式
-            converted_policies = []
-            for i, policy in enumerate(crawled_data):
-                converted_policy = {
-                    "policy_id": policy.get("policy_id", f"CRAWL_{i+1:03d}"),
-                    "policy_name": policy.get("title", "未知政策"),
-                    "region": policy.get("region", "徐汇区"),
-                    "support_type": policy.get("policy_type", "subsidy"),
-                    "max_amount": policy.get("max_amount", 1000000),
-                    "deadline": policy.get("publish_date", "2024-12-31"),
-                    "industry_tags": policy.get("industry_tags", ["科技创新"]),
-                    "source_url": policy.get("url", ""),
-                    "requirements": policy.get("requirements", ["企业注册地在徐汇区", "符合相关条件"]),
-                    "target_industries": ["ai", "tech"],
-                    "target_scale": ["small", "medium", "large"],
-                    "target_rd": ["medium", "high"],
-                    "base_score": 0.75,
-                    "application_period": "全年申报",
-                    "approval_department": policy.get("department", "徐汇区相关部门")
-                }
-                converted_policies.append(converted_policy)
-            
-            POLICIES_DATABASE.extend(converted_policies)
-            print(f"✅ 成功加载 {len(converted_policies)} 条爬取的政策数据")
-            return len(converted_policies)
-            
+            publish_snapshot(await asyncio.to_thread(open_snapshot, POLICY_SNAPSHOT_PATH))
+            snapshot = current_snapshot()
         except Exception as e:
-            print(f"⚠️ 加载爬取数据失败: {e}")
+            print(f"⚠️ 映射政策二进制快照失败，改为解析JSON: {e}")
     
-    # 如果没有爬取数据，使用基础模拟数据
-    if not POLICIES_DATABASE:
-        POLICIES_DATABASE.extend(get_fallback_policies())
-        print("📋 使用默认政策数据")
+    if snapshot is None:
+        snapshot = await load_snapshot(load_crawled_policies)
+        await asyncio.to_thread(write_snapshot_file, snapshot, source_hash)
     
-    return len(POLICIES_DATABASE)
+    schedule_match_table_rebuild(snapshot)
+    return snapshot
+
+def _rebuild_match_table(snapshot: PolicySnapshot):
+    """为指定快照构建匹配表并挂载到快照上；构建失败时记录错误，请求继续走实时打分"""
+    try:
+        snapshot.match_table = build_match_table(snapshot.compiled, MATCH_TABLE_TOP_K, MATCH_SCORE_THRESHOLD)
+    except Exception as e:
+        print(f"⚠️ 政策快照 v{snapshot.version} 的预计算匹配表构建失败，将使用实时打分: {e}")
+        return
+    print(f"📊 政策快照 v{snapshot.version} 的预计算匹配表已就绪，共 {snapshot.match_table.row_count} 个画像组合")
+
+def schedule_match_table_rebuild(snapshot: PolicySnapshot):
+    """政策快照更新后在后台线程重建匹配表"""
+    if not MATCH_TABLE_ENABLED or snapshot.match_table is not None:
+        return
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(None, _rebuild_match_table, snapshot)
 
 def get_fallback_policies():
     """获取基础模拟政策数据（当爬取失败时使用）"""
@@ -219,6 +334,13 @@ def get_fallback_policies():
 
 def calculate_policy_match(company: CompanyProfile, policy: dict) -> Optional[PolicyMatch]:
     """使用真实数据计算企业与政策的匹配度"""
+    result = evaluate_policy_match(company, policy)
+    if result is None:
+        return None
+    return PolicyMatch(**{field: policy[field] for field in POLICY_MATCH_FIELDS}, **result)
+
+def evaluate_policy_match(company: CompanyProfile, policy: dict, deadline_day: Optional[int] = None) -> Optional[dict]:
+    """计算匹配结果中随企业变化的部分：匹配度、满足/缺失要求和推荐建议"""
     
     # 基础匹配分数
     match_score = policy["base_score"]
@@ -323,85 +445,120 @@ def calculate_policy_match(company: CompanyProfile, policy: dict) -> Optional[Po
     match_score = max(0.0, min(1.0, match_score))
     
     # 生成个性化推荐建议
-    recommendation = generate_smart_recommendation(company, policy, match_score, missing_requirements)
-    
-    return PolicyMatch(
-        policy_id=policy["policy_id"],
-        policy_name=policy["policy_name"],
-        region=policy["region"],
-        support_type=policy["support_type"],
-        max_amount=policy["max_amount"],
-        deadline=policy["deadline"],
-        industry_tags=policy["industry_tags"],
-        source_url=policy["source_url"],
-        requirements=policy["requirements"],
-        match_score=match_score,
-        matched_requirements=matched_requirements,
-        missing_requirements=missing_requirements,
-        recommendation=recommendation
+    recommendation = generate_smart_recommendation(company, policy, match_score, missing_requirements, deadline_day)
+    
+    return {
+        "match_score": match_score,
+        "matched_requirements": matched_requirements,
+        "missing_requirements": missing_requirements,
+        "recommendation": recommendation
+    }
+
+# 推荐建议缓存上限（建议文本只取决于少数几个离散特征，见 compose_recommendation）
+RECOMMENDATION_CACHE_SIZE = 4096
+
+# 匹配度分档（从高到低）对应的主要建议
+SCORE_BAND_ADVICE = [
+    (0.85, "🎯 **强烈推荐申请！** 您的企业条件与该政策高度匹配，成功概率很高。"),
+    (0.70, "👍 **推荐申请** 您的企业具备良好的申请条件，建议积极准备材料。"),
+    (0.50, "🤔 **可以考虑申请** 需要完善部分条件，建议评估投入产出比。"),
+    (0.30, "📋 **暂不建议申请** 当前条件不够充分，建议先提升企业资质。"),
+    (float("-inf"), "❌ **不适合申请** 企业条件与政策要求差距较大。"),
+]
+
+# 基于政策类型的申报建议
+SUPPORT_TYPE_ADVICE = {
+    "grant": "💰 **无偿资助政策** - 重点准备项目实施方案、预算明细和技术路线图。建议展示项目的创新性和产业化前景。",
+    "subsidy": "💵 **补贴政策** - 准备相关支出凭证和财务审计报告。确保资金用途符合政策规定。",
+    "tax": "🧾 **税收优惠政策** - 准备研发费用归集、知识产权证明等材料。建议提前规划税务筹划。",
+    "loan": "🏦 **融资支持政策** - 准备完整的财务报表、资信证明和担保材料。确保还款能力充足。",
+    "investment": "💼 **投资政策** - 准备详细的商业计划书和团队介绍。重点展示商业模式和市场前景。"
+}
+
+def generate_smart_recommendation(
+    company: CompanyProfile,
+    policy: dict,
+    score: float,
+    missing: List[str],
+    deadline_day: Optional[int] = None
+) -> str:
+    """
+    生成智能化个性化推荐建议
+
+    deadline_day 为预先解析好的截止日期序号（见 CompiledPolicies.deadline_days），
+    未提供时从政策的 deadline 字段解析。
+    """
+    band = next(i for i, (lower, _) in enumerate(SCORE_BAND_ADVICE) if score >= lower)
+    
+    # 截止日期只在90天内才影响建议内容
+    if deadline_day is None:
+        deadline_day = deadline_ordinal(policy.get("deadline"))
+    days_left = None
+    if deadline_day:
+        days_left = (datetime.fromordinal(deadline_day) - datetime.now()).days
+        if days_left > 90:
+            days_left = None
+    
+    missing_str = " ".join(missing)
+    return compose_recommendation(
+        band,
+        company.enterprise_certification == "high_tech",
+        company.patents >= 5,
+        company.industry_match == "ai",
+        policy["support_type"],
+        days_left,
+        "专利" in missing_str,
+        "研发投入" in missing_str,
+        "认定" in missing_str
     )
 
-def generate_smart_recommendation(company: CompanyProfile, policy: dict, score: float, missing: List[str]) -> str:
-    """生成智能化个性化推荐建议"""
+@lru_cache(maxsize=RECOMMENDATION_CACHE_SIZE)
+def compose_recommendation(
+    band: int,
+    high_tech: bool,
+    rich_patents: bool,
+    ai_industry: bool,
+    support_type: str,
+    days_left: Optional[int],
+    patent_gap: bool,
+    rd_gap: bool,
+    certification_gap: bool
+) -> str:
+    """按离散特征拼接推荐建议；相同特征返回同一个缓存的字符串"""
     
     recommendations = []
     
     # 基于匹配度的主要建议
-    if score >= 0.85:
-        recommendations.append("🎯 **强烈推荐申请！** 您的企业条件与该政策高度匹配，成功概率很高。")
-    elif score >= 0.70:
-        recommendations.append("👍 **推荐申请** 您的企业具备良好的申请条件，建议积极准备材料。")
-    elif score >= 0.50:
-        recommendations.append("🤔 **可以考虑申请** 需要完善部分条件，建议评估投入产出比。")
-    elif score >= 0.30:
-        recommendations.append("📋 **暂不建议申请** 当前条件不够充分，建议先提升企业资质。")
-    else:
-        recommendations.append("❌ **不适合申请** 企业条件与政策要求差距较大。")
+    recommendations.append(SCORE_BAND_ADVICE[band][1])
     
     # 基于企业特点的针对性建议
-    if company.enterprise_certification == "high_tech":
+    if high_tech:
         recommendations.append("🏆 作为高新技术企业，您在税收优惠和科技项目申报方面有显著优势。")
     
-    if company.patents >= 5:
+    if rich_patents:
         recommendations.append("💎 您的知识产权储备丰富，在创新类政策申报中具有竞争优势。")
     
-    if company.industry_match == "ai":
+    if ai_industry:
         recommendations.append("🤖 AI产业是当前政策重点支持领域，建议关注相关专项政策。")
     
     # 基于政策类型的申报建议
-    support_type_advice = {
-        "grant": "💰 **无偿资助政策** - 重点准备项目实施方案、预算明细和技术路线图。建议展示项目的创新性和产业化前景。",
-        "subsidy": "💵 **补贴政策** - 准备相关支出凭证和财务审计报告。确保资金用途符合政策规定。",
-        "tax": "🧾 **税收优惠政策** - 准备研发费用归集、知识产权证明等材料。建议提前规划税务筹划。",
-        "loan": "🏦 **融资支持政策** - 准备完整的财务报表、资信证明和担保材料。确保还款能力充足。",
-        "investment": "💼 **投资政策** - 准备详细的商业计划书和团队介绍。重点展示商业模式和市场前景。"
-    }
-    
-    if policy["support_type"] in support_type_advice:
-        recommendations.append(support_type_advice[policy["support_type"]])
+    if support_type in SUPPORT_TYPE_ADVICE:
+        recommendations.append(SUPPORT_TYPE_ADVICE[support_type])
     
     # 时间规划建议
-    deadline_str = policy.get("deadline", "")
-    if deadline_str:
-        try:
-            deadline = datetime.strptime(deadline_str, "%Y-%m-%d")
-            days_left = (deadline - datetime.now()).days
-            if days_left <= 30:
-                recommendations.append(f"⏰ **紧急提醒** 申报截止时间仅剩{days_left}天，请抓紧准备材料！")
-            elif days_left <= 90:
-                recommendations.append(f"📅 申报截止时间还有{days_left}天，建议尽快启动申报准备工作。")
-        except:
-            pass
+    if days_left is not None:
+        if days_left <= 30:
+            recommendations.append(f"⏰ **紧急提醒** 申报截止时间仅剩{days_left}天，请抓紧准备材料！")
+        else:
+            recommendations.append(f"📅 申报截止时间还有{days_left}天，建议尽快启动申报准备工作。")
     
     # 基于缺失条件的改进建议
-    if missing:
-        missing_str = " ".join(missing)
-        if "专利" in missing_str:
-            recommendations.append("📝 **知识产权建议**: 可以先申请实用新型专利或软件著作权，审批周期较短。")
-        if "研发投入" in missing_str:
-            recommendations.append("🔬 **研发投入建议**: 建立研发项目台账，规范研发费用归集和管理。")
-        if "认定" in missing_str:
-            recommendations.append("🏅 **资质认定建议**: 高新技术企业认定每年4-6月申报，专精特新认定通常在下半年。")
+    if patent_gap:
+        recommendations.append("📝 **知识产权建议**: 可以先申请实用新型专利或软件著作权，审批周期较短。")
+    if rd_gap:
+        recommendations.append("🔬 **研发投入建议**: 建立研发项目台账，规范研发费用归集和管理。")
+    if certification_gap:
+        recommendations.append("🏅 **资质认定建议**: 高新技术企业认定每年4-6月申报，专精特新认定通常在下半年。")
     
     return " ".join(recommendations)
 
@@ -443,35 +600,37 @@ def get_rd_name(code: str) -> str:
 @app.get("/api/v1/health")
 async def health_check():
     """健康检查"""
+    snapshot = current_snapshot()
     return {
         "status": "healthy",
         "timestamp": datetime.now(),
         "version": "1.0.0",
         "service": "PolicyPilot API",
-        "policies_loaded": len(POLICIES_DATABASE)
+        "policies_loaded": len(snapshot),
+        "snapshot_version": snapshot.version
     }
 
 @app.get("/api/v1/policies/count")
 async def get_policy_count():
     """获取政策统计信息"""
-    active_policies = len([p for p in POLICIES_DATABASE if datetime.strptime(p["deadline"], "%Y-%m-%d") > datetime.now()])
+    stats = current_snapshot().stats
     
     return {
         "success": True,
         "data": {
-            "total_policies": len(POLICIES_DATABASE),
-            "active_policies": active_policies,
+            "total_policies": stats.total,
+            "active_policies": stats.active_count(),
             "by_region": {
-                "xuhui": len([p for p in POLICIES_DATABASE if p["region"] == "徐汇区"]),
-                "shanghai": len([p for p in POLICIES_DATABASE if p["region"] == "上海市"]),
-                "national": len([p for p in POLICIES_DATABASE if p["region"] == "全国"])
+                "xuhui": stats.by_region["徐汇区"],
+                "shanghai": stats.by_region["上海市"],
+                "national": stats.by_region["全国"]
             },
             "by_type": {
-                "grant": len([p for p in POLICIES_DATABASE if p["support_type"] == "grant"]),
-                "subsidy": len([p for p in POLICIES_DATABASE if p["support_type"] == "subsidy"]),
-                "loan": len([p for p in POLICIES_DATABASE if p["support_type"] == "loan"]),
-                "tax": len([p for p in POLICIES_DATABASE if p["support_type"] == "tax"]),
-                "investment": len([p for p in POLICIES_DATABASE if p["support_type"] == "investment"])
+                "grant": stats.by_type["grant"],
+                "subsidy": stats.by_type["subsidy"],
+                "loan": stats.by_type["loan"],
+                "tax": stats.by_type["tax"],
+                "investment": stats.by_type["investment"]
             }
         }
     }
@@ -479,79 +638,180 @@ async def get_policy_count():
 @app.get("/api/v1/policies")
 async def get_policies(limit: int = 10, region: Optional[str] = None):
     """获取政策列表"""
-    policies = POLICIES_DATABASE
+    snapshot = current_snapshot()
     
     if region:
-        policies = [p for p in policies if p["region"] == region]
+        # 按编译后的地区编码筛选，只解码需要返回的政策
+        compiled = snapshot.compiled
+        region_code = compiled.regions.codes.get(region, -1)
+        positions = np.flatnonzero(compiled.region_codes == region_code)
+        total = len(positions)
+        positions = positions[:limit].tolist()
+    else:
+        positions = range(len(snapshot))[:limit]
+        total = len(snapshot)
     
-    return {
+    # 直接拼接快照上缓存的政策JSON片段
+    return FastJSONResponse({
         "success": True,
         "data": {
-            "policies": policies[:limit],
-            "total": len(policies),
-            "filtered": len(policies) if region else len(POLICIES_DATABASE)
+            "policies": [join_object(snapshot.policy_members(index)) for index in positions],
+            "total": total,
+            "filtered": total if region else len(snapshot)
         }
-    }
+    })
+
+@app.get("/api/v1/policies/{policy_id}")
+async def get_policy_detail(policy_id: str):
+    """获取政策详情（包含正文）"""
+    snapshot = current_snapshot()
+    index = snapshot.position_of(policy_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"政策不存在: {policy_id}")
+    
+    return FastJSONResponse({
+        "success": True,
+        "data": join_object(snapshot.policy_members(index), dumps_members({"content": snapshot.content(index)}))
+    })
 
 @app.post("/api/v1/crawler/refresh")
 async def refresh_crawled_data():
     """刷新爬取的政策数据"""
     try:
-        # 重新加载爬取数据
-        loaded_count = load_crawled_policies()
+        # 重新加载爬取数据，构建并发布新快照
+        snapshot = await reload_policies()
         
         return {
             "success": True,
-            "message": f"成功刷新政策数据，共加载 {loaded_count} 条政策",
+            "message": f"成功刷新政策数据，共加载 {len(snapshot)} 条政策",
             "data": {
-                "total_policies": len(POLICIES_DATABASE),
+                "total_policies": len(snapshot),
+                "snapshot_version": snapshot.version,
                 "refresh_time": datetime.now().isoformat()
             }
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"刷新数据失败: {str(e)}")
 
+def find_top_matches(snapshot: PolicySnapshot, company: CompanyProfile, top_k: int) -> List[tuple]:
+    """在给定的政策快照上计算企业的TopK匹配政策，返回 (政策位置, 匹配结果) 列表"""
+    table = snapshot.match_table
+    if table is not None and top_k <= table.k:
+        # 预计算匹配表命中：一次查表得到TopK政策
+        top_positions = table.lookup(company, top_k)
+    else:
+        # 倒排位图求候选集后列式打分，只保留匹配度>25%的政策，再用有界堆选出TopK
+        positions, scores = snapshot.compiled.match(company, MATCH_SCORE_THRESHOLD)
+        top_positions = [index for index, _ in select_top_k(positions, scores, top_k)]
+    
+    # 只为入选政策生成推荐建议和要求列表（截止日期使用快照加载时解析好的日期序号）
+    deadline_days = snapshot.compiled.deadline_days
+    return [
+        (index, evaluate_policy_match(company, snapshot.policies[index], int(deadline_days[index])))
+        for index in top_positions
+    ]
+
+def encode_matches(snapshot: PolicySnapshot, top_matches: List[tuple]) -> List[RawJSON]:
+    """把匹配结果编码为JSON片段：政策字段复用快照缓存，只编码随企业变化的部分"""
+    return [
+        join_object(snapshot.match_members(index), dumps_members(result))
+        for index, result in top_matches
+    ]
+
 @app.post("/api/v1/match/simple")
-async def match_policies(company: CompanyProfile):
+async def match_policies(company: CompanyProfile, top_k: int = Query(5, ge=1, le=MATCH_MAX_TOP_K)):
     """智能政策匹配 - 使用真实数据"""
     try:
-        matches = []
-        
-        # 对每个政策进行匹配计算
-        for policy in POLICIES_DATABASE:
-            match_result = calculate_policy_match(company, policy)
-            if match_result and match_result.match_score > 0.25:  # 只返回匹配度>25%的政策
-                matches.append(match_result)
-        
-        # 按匹配度排序，返回Top5
-        matches.sort(key=lambda x: x.match_score, reverse=True)
-        top_matches = matches[:5]
+        snapshot = current_snapshot()
+        top_matches = find_top_matches(snapshot, company, top_k)
         
         # 保存企业信息到数据库（可选）
-        save_company_profile(company)
+        await save_company_profile(company)
         
-        return MatchResponse(
-            success=True,
-            message=f"基于 {len(POLICIES_DATABASE)} 条政策数据成功匹配到 {len(top_matches)} 个政策机会",
-            data={
+        # 结构与 MatchResponse 一致，直接编码为字节，不再经过 .dict() 和 jsonable_encoder
+        return FastJSONResponse({
+            "success": True,
+            "message": f"基于 {len(snapshot)} 条政策数据成功匹配到 {len(top_matches)} 个政策机会",
+            "data": {
                 "company_info": company.dict(),
-                "matches": [match.dict() for match in top_matches],
+                "matches": encode_matches(snapshot, top_matches),
                 "count": len(top_matches),
-                "total_checked": len(POLICIES_DATABASE),
+                "total_checked": len(snapshot),
                 "match_timestamp": datetime.now().isoformat(),
-                "avg_match_score": sum(m.match_score for m in top_matches) / len(top_matches) if top_matches else 0
+                "avg_match_score": sum(result["match_score"] for _, result in top_matches) / len(top_matches) if top_matches else 0
             }
-        )
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"政策匹配失败: {str(e)}")
 
-def save_company_profile(company: CompanyProfile):
-    """保存企业信息到数据库"""
+async def spool_request_body(request: Request) -> IO[str]:
+    """把上传内容写入临时文件（超过1MB落盘），返回从头读取的文本流"""
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    async for chunk in request.stream():
+        spool.write(chunk)
+    spool.seek(0)
+    # utf-8-sig 兼容Excel导出CSV带的BOM
+    return io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+
+def iter_company_rows(body: IO[str], is_csv: bool) -> Iterator[tuple]:
+    """把JSONL或CSV文本解析为 (行号, 企业画像字段)，空行跳过"""
+    if is_csv:
+        reader = csv.DictReader(body)
+        for row in reader:
+            # CSV空单元格视为未填写
+            yield reader.line_num, {key.strip(): value for key, value in row.items() if key and value}
+    else:
+        for line_no, line in enumerate(body, start=1):
+            if line.strip():
+                yield line_no, line
+
+def stream_batch_matches(
+    body: IO[str],
+    is_csv: bool,
+    top_k: int,
+    snapshot: PolicySnapshot
+) -> Iterator[bytes]:
+    """逐个企业计算匹配结果，每个企业输出一行NDJSON"""
+    try:
+        for line_no, row in iter_company_rows(body, is_csv):
+            try:
+                fields = json.loads(row) if isinstance(row, str) else row
+                company = CompanyProfile(**fields)
+                top_matches = find_top_matches(snapshot, company, top_k)
+                result = {
+                    "line": line_no,
+                    "success": True,
+                    "company_name": company.company_name,
+                    "matches": encode_matches(snapshot, top_matches),
+                    "count": len(top_matches)
+                }
+            except Exception as e:
+                result = {"line": line_no, "success": False, "error": str(e)}
+            yield dumps(result) + b"\n"
+    finally:
+        body.close()
+
+@app.post("/api/v1/match/batch")
+async def match_policies_batch(request: Request, top_k: int = Query(5, ge=1, le=MATCH_MAX_TOP_K)):
+    """
+    批量政策匹配
+    
+    请求体为每行一个企业画像的JSONL，或首行为表头的CSV（Content-Type: text/csv）。
+    上传内容先落到临时文件，再逐个企业计算并输出一行NDJSON结果，内存占用与
+    上传大小无关。整批请求固定使用同一份政策快照。
+    """
+    is_csv = "csv" in request.headers.get("content-type", "")
+    body = await spool_request_body(request)
+    
+    return StreamingResponse(
+        stream_batch_matches(body, is_csv, top_k, current_snapshot()),
+        media_type="application/x-ndjson"
+    )
+
+async def save_company_profile(company: CompanyProfile):
+    """保存企业信息（放入后台写入队列，队列满时等待）"""
     try:
-        # 创建数据目录
-        os.makedirs("data", exist_ok=True)
-        
         # 简单的JSON文件存储
         profile_data = {
             "company_info": company.dict(),
@@ -559,8 +819,7 @@ def save_company_profile(company: CompanyProfile):
             "id": f"company_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         }
         
-        with open(f"data/companies.jsonl", "a", encoding="utf-8") as f:
-            f.write(json.dumps(profile_data, ensure_ascii=False) + "\n")
+        await profile_writer.submit(profile_data)
             
     except Exception as e:
         print(f"保存企业信息失败: {e}")
@@ -570,8 +829,24 @@ def save_company_profile(company: CompanyProfile):
 async def startup_event():
     """应用启动时加载政策数据"""
     print("🚀 启动PolicyPilot API服务器...")
-    loaded_count = load_crawled_policies()
-    print(f"📋 政策数据库已就绪，共 {loaded_count} 条政策")
+    await shared_http_client.start(**HTTP_CLIENT_OPTIONS)
+    await profile_writer.start()
+    snapshot = await reload_policies(from_snapshot_file=True)
+    print(f"📋 政策数据库已就绪，共 {len(snapshot)} 条政策（快照 v{snapshot.version}）")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时写完队列中的企业信息并关闭共享HTTP连接"""
+    await profile_writer.stop()
+    await shared_http_client.close()
+
+@app.get("/api/v1/http/pool")
+async def get_http_pool_stats():
+    """共享HTTP客户端连接池统计"""
+    return {
+        "success": True,
+        "data": shared_http_client.stats()
+    }
 
 # 直接在main.py中添加AI聊天端点
 @app.post("/api/v1/ai/chat")
@@ -629,45 +904,46 @@ async def chat_with_ai(request: ChatRequest):
         })
         
         # 调用DeepSeek API
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{DEEPSEEK_BASE_URL}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": DEEPSEEK_MODEL,
-                    "messages": messages,
-                    "temperature": 0.7,
-                    "max_tokens": 2000,
-                    "top_p": 0.9,
-                    "frequency_penalty": 0.1,
-                    "presence_penalty": 0.1
+        client = shared_http_client.client
+        response = await client.post(
+            f"{DEEPSEEK_BASE_URL}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": DEEPSEEK_MODEL,
+                "messages": messages,
+                "temperature": 0.7,
+                "max_tokens": 2000,
+                "top_p": 0.9,
+                "frequency_penalty": 0.1,
+                "presence_penalty": 0.1
+            },
+            timeout=shared_http_client.timeout(DEEPSEEK_CHAT_TIMEOUT)
+        )
+        
+        if response.status_code == 200:
+            result = response.json()
+            content = result['choices'][0]['message']['content']
+            tokens_used = result.get('usage', {}).get('total_tokens', 0)
+            
+            return {
+                "success": True,
+                "message": "AI回复成功",
+                "data": {
+                    "response": content,
+                    "timestamp": datetime.now().isoformat(),
+                    "tokens_used": tokens_used
                 }
+            }
+        else:
+            error_detail = response.text
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"DeepSeek API调用失败: {error_detail}"
             )
             
-            if response.status_code == 200:
-                result = response.json()
-                content = result['choices'][0]['message']['content']
-                tokens_used = result.get('usage', {}).get('total_tokens', 0)
-                
-                return {
-                    "success": True,
-                    "message": "AI回复成功",
-                    "data": {
-                        "response": content,
-                        "timestamp": datetime.now().isoformat(),
-                        "tokens_used": tokens_used
-                    }
-                }
-            else:
-                error_detail = response.text
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"DeepSeek API调用失败: {error_detail}"
-                )
-                
     except httpx.TimeoutException:
         raise HTTPException(
             status_code=504,
@@ -683,11 +959,12 @@ async def chat_with_ai(request: ChatRequest):
 if __name__ == "__main__":
     print("🚀 启动PolicyPilot API服务器...")
     print("📊 正在加载政策数据...")
-    load_crawled_policies()
-    print(f"📋 共加载 {len(POLICIES_DATABASE)} 条政策")
+    publish_snapshot(build_snapshot(load_crawled_policies()))
+    print(f"📋 共加载 {len(current_snapshot())} 条政策")
     print("🔗 API文档: http://localhost:8000/docs")
     print("💚 健康检查: http://localhost:8000/api/v1/health")
     print("🎯 政策匹配: http://localhost:8000/api/v1/match/simple")
+    print("📦 批量匹配: http://localhost:8000/api/v1/match/batch")
     print("🔄 刷新数据: http://localhost:8000/api/v1/crawler/refresh")
     print("-" * 60)
     
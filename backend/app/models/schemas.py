@@ -39,6 +39,11 @@ class SupportType(str, Enum):
     SUBSIDY = "subsidy"  # 补贴
     OTHER = "other"
 
+class ScoreSource(str, Enum):
+    """匹配分数来源枚举"""
+    LLM = "llm"  # DeepSeek分析（含缓存结果）
+    RULE = "rule"  # 规则预评分（未进入或未完成AI分析）
+
 class CompanyProfile(BaseModel):
     """企业画像数据模型"""
     company_name: str = Field(..., description="企业名称")
@@ -86,12 +91,14 @@ class PolicyMatch(BaseModel):
     missing_requirements: List[str] = Field(..., description="不满足的要求")
     recommendation: str = Field(..., description="AI推荐建议")
     source_url: str = Field(..., description="政策原文链接")
+    score_source: ScoreSource = Field(ScoreSource.LLM, description="分数来源：llm 为AI分析，rule 为规则预评分")
 
 class MatchRequest(BaseModel):
     """政策匹配请求模型"""
     company_profile: CompanyProfile
     top_k: int = Field(5, ge=1, le=20, description="返回top-k个匹配结果")
     min_score: float = Field(0.3, ge=0, le=1, description="最低匹配分数阈值")
+    llm_budget: Optional[int] = Field(None, ge=0, le=20, description="本次请求最多进行AI分析的政策数，默认使用 MATCH_LLM_BUDGET")
 
 class MatchResponse(BaseModel):
     """政策匹配响应模型"""
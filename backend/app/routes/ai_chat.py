@@ -8,6 +8,7 @@ import logging
 from datetime import datetime
 
 from ..config import settings
+from ..services.http_client import shared_http_client
 from ..models.schemas import APIResponse
 
 logger = logging.getLogger(__name__)
@@ -157,37 +158,40 @@ def build_system_prompt(policy_context: Optional[Dict[str, Any]] = None) -> str:
 async def call_deepseek_api(messages: List[Dict[str, str]]) -> tuple[str, int]:
     """调用DeepSeek API"""
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{settings.DEEPSEEK_BASE_URL}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {settings.DEEPSEEK_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": settings.DEEPSEEK_MODEL,
-                    "messages": messages,
-                    "temperature": 0.7,
-                    "max_tokens": 2000,
-                    "top_p": 0.9,
-                    "frequency_penalty": 0.1,
-                    "presence_penalty": 0.1
-                }
+        client = shared_http_client.client
+        response = await client.post(
+            f"{settings.DEEPSEEK_BASE_URL}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {settings.DEEPSEEK_API_KEY}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": settings.DEEPSEEK_MODEL,
+                "messages": messages,
+                "temperature": 0.7,
+                "max_tokens": 2000,
+                "top_p": 0.9,
+                "frequency_penalty": 0.1,
+                "presence_penalty": 0.1
+            },
+            timeout=shared_http_client.timeout(
+                settings.DEEPSEEK_CHAT_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT
+            )
+        )
+        
+        if response.status_code == 200:
+            result = response.json()
+            content = result['choices'][0]['message']['content']
+            tokens_used = result.get('usage', {}).get('total_tokens', 0)
+            return content, tokens_used
+        else:
+            error_detail = response.text
+            logger.error(f"DeepSeek API错误 {response.status_code}: {error_detail}")
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"DeepSeek API调用失败: {error_detail}"
             )
             
-            if response.status_code == 200:
-                result = response.json()
-                content = result['choices'][0]['message']['content']
-                tokens_used = result.get('usage', {}).get('total_tokens', 0)
-                return content, tokens_used
-            else:
-                error_detail = response.text
-                logger.error(f"DeepSeek API错误 {response.status_code}: {error_detail}")
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"DeepSeek API调用失败: {error_detail}"
-                )
-                
     except httpx.TimeoutException:
         raise HTTPException(
             status_code=504,
@@ -203,44 +207,47 @@ async def call_deepseek_api(messages: List[Dict[str, str]]) -> tuple[str, int]:
 async def stream_deepseek_response(messages: List[Dict[str, str]]) -> AsyncGenerator[str, None]:
     """流式调用DeepSeek API"""
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            async with client.stream(
-                'POST',
-                f"{settings.DEEPSEEK_BASE_URL}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {settings.DEEPSEEK_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": settings.DEEPSEEK_MODEL,
-                    "messages": messages,
-                    "temperature": 0.7,
-                    "max_tokens": 2000,
-                    "stream": True
-                }
-            ) as response:
-                if response.status_code != 200:
-                    error_detail = await response.aread()
-                    raise HTTPException(
-                        status_code=response.status_code,
-                        detail=f"DeepSeek API调用失败: {error_detail.decode()}"
-                    )
-                
-                async for line in response.aiter_lines():
-                    if line.startswith('data: '):
-                        data = line[6:]  # 移除 'data: ' 前缀
-                        if data.strip() == '[DONE]':
-                            break
+        client = shared_http_client.client
+        async with client.stream(
+            'POST',
+            f"{settings.DEEPSEEK_BASE_URL}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {settings.DEEPSEEK_API_KEY}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": settings.DEEPSEEK_MODEL,
+                "messages": messages,
+                "temperature": 0.7,
+                "max_tokens": 2000,
+                "stream": True
+            },
+            timeout=shared_http_client.timeout(
+                settings.DEEPSEEK_CHAT_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT
+            )
+        ) as response:
+            if response.status_code != 200:
+                error_detail = await response.aread()
+                raise HTTPException(
+                    status_code=response.status_code,
+                    detail=f"DeepSeek API调用失败: {error_detail.decode()}"
+                )
+            
+            async for line in response.aiter_lines():
+                if line.startswith('data: '):
+                    data = line[6:]  # 移除 'data: ' 前缀
+                    if data.strip() == '[DONE]':
+                        break
+                    
+                    try:
+                        json_data = json.loads(data)
+                        delta = json_data.get('choices', [{}])[0].get('delta', {})
+                        content = delta.get('content', '')
+                        if content:
+                            yield content
+                    except json.JSONDecodeError:
+                        continue
                         
-                        try:
-                            json_data = json.loads(data)
-                            delta = json_data.get('choices', [{}])[0].get('delta', {})
-                            content = delta.get('content', '')
-                            if content:
-                                yield content
-                        except json.JSONDecodeError:
-                            continue
-                            
     except Exception as e:
         logger.error(f"流式调用DeepSeek API异常: {e}")
         yield f"抱歉，AI服务出现异常: {str(e)}"
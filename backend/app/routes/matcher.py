@@ -1,5 +1,6 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 import time
 import logging
 from typing import List
@@ -9,6 +10,7 @@ from ..models.schemas import (
     APIResponse
 )
 from ..services.policy_matcher import policy_matcher_service
+from ..services.json_codec import dumps
 from ..database import get_db, Company, MatchHistory
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, insert
@@ -16,6 +18,26 @@ from sqlalchemy import select, insert
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+@router.on_event("startup")
+async def warm_up_matcher():
+    """在后台预热ChromaDB和BGE模型，不阻塞服务启动"""
+    policy_matcher_service.start_warm_up()
+
+@router.on_event("shutdown")
+async def stop_matcher():
+    """停止向量推理器，等待中的匹配请求不会阻塞关闭"""
+    await policy_matcher_service.shutdown()
+
+@router.get("/ready")
+async def readiness():
+    """
+    就绪检查
+    
+    返回各组件的预热状态；未全部就绪时返回503，匹配请求此时走规则评分的降级路径
+    """
+    status = policy_matcher_service.readiness()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
 @router.post("/match", response_model=MatchResponse)
 async def match_policies(
     request: MatchRequest,
@@ -36,7 +58,8 @@ async def match_policies(
         matches = await policy_matcher_service.match_policies(
             company_profile=request.company_profile,
             top_k=request.top_k,
-            min_score=request.min_score
+            min_score=request.min_score,
+            llm_budget=request.llm_budget
         )
         
         # 获取总政策数量
@@ -68,6 +91,54 @@ async def match_policies(
             detail=f"政策匹配服务异常: {str(e)}"
         )
 
+@router.post("/match/stream")
+async def match_policies_stream(request: MatchRequest, http_request: Request):
+    """
+    流式匹配政策（Server-Sent Events）
+    
+    依次推送事件：
+    - preliminary：召回后立即推送的规则评分结果 {"matches": [...]}
+    - match：每个AI分析完成时推送更新后的单个匹配结果
+    - summary：全部分析完成后的最终排序结果 {"matches": [...], "processing_time": 秒}
+    - error：匹配失败 {"detail": "..."}
+    
+    客户端断开连接时停止推送，并取消未完成的DeepSeek请求。
+    """
+    start_time = time.time()
+    logger.info(f"开始为企业 {request.company_profile.company_name} 流式匹配政策")
+    
+    async def event_stream():
+        events = policy_matcher_service.stream_matches(
+            company_profile=request.company_profile,
+            top_k=request.top_k,
+            min_score=request.min_score,
+            llm_budget=request.llm_budget
+        )
+        try:
+            async for event, data in events:
+                if await http_request.is_disconnected():
+                    logger.info(f"客户端已断开，取消企业 {request.company_profile.company_name} 的匹配")
+                    break
+                if event == "match":
+                    payload = data
+                else:
+                    payload = {"matches": data}
+                    if event == "summary":
+                        payload["processing_time"] = time.time() - start_time
+                yield _sse_event(event, payload)
+        except Exception as e:
+            logger.error(f"流式政策匹配失败: {e}")
+            yield _sse_event("error", {"detail": f"政策匹配服务异常: {str(e)}"})
+        finally:
+            # 关闭生成器，取消仍在进行的AI分析
+            await events.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/match/simple")
 async def match_policies_simple(
     company_profile: CompanyProfile,
@@ -131,6 +202,31 @@ async def get_policies_count(db: AsyncSession = Depends(get_db)):
             detail=f"获取政策统计失败: {str(e)}"
         )
 
+@router.get("/embedding/stats")
+async def get_embedding_stats():
+    """获取查询向量批量推理统计（批大小、队列深度）和查询向量缓存命中情况"""
+    return APIResponse(
+        success=True,
+        message="获取向量推理统计成功",
+        data={
+            **policy_matcher_service.embedding_worker.stats(),
+            "cache": policy_matcher_service.embedding_cache.stats()
+        }
+    )
+
+@router.get("/analysis/stats")
+async def get_analysis_stats():
+    """获取AI分析请求合并统计（进行中的调用、等待数、合并次数）和分析缓存命中情况"""
+    cache = policy_matcher_service.analysis_cache
+    return APIResponse(
+        success=True,
+        message="获取AI分析统计成功",
+        data={
+            **policy_matcher_service.analysis_flights.stats(),
+            "cache": {"hits": cache.hits, "misses": cache.misses}
+        }
+    )
+
 @router.get("/match/history/{company_name}")
 async def get_match_history(
     company_name: str,
@@ -188,6 +284,10 @@ async def get_match_history(
             detail=f"获取匹配历史失败: {str(e)}"
         )
 
+def _sse_event(event: str, payload) -> bytes:
+    """编码一条SSE事件"""
+    return b"event: " + event.encode() + b"\ndata: " + dumps(jsonable_encoder(payload)) + b"\n\n"
+
 async def _get_total_policies_count(db: AsyncSession) -> int:
     """获取政策总数"""
     from ..database import Policy
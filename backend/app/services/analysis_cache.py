@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(value: Any) -> str:
+    """对可JSON序列化的内容计算稳定的哈希"""
+    data = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    AI匹配分析结果的两级缓存
+
+    第一级为进程内LRU，第二级为SQLite文件（进程重启和多个worker间共享）。
+    每条记录带过期时间；同一政策出现新的内容哈希时，该政策的旧记录全部删除。
+    内存命中在事件循环中直接返回，SQLite读写在线程池中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, path: str, max_entries: int = 2048, ttl: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._policy_hashes: Dict[str, str] = {}
+        # _lock 只保护内存中的记录（不在持有时做IO，事件循环中可直接获取）；_db_lock 串行化SQLite访问
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    key TEXT PRIMARY KEY,
+                    policy_id TEXT NOT NULL,
+                    policy_hash TEXT NOT NULL,
+                    analysis TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_policy ON analysis_cache (policy_id)")
+            db.execute("DELETE FROM analysis_cache WHERE expires_at < ?", (time.time(),))
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _remember(self, key: str, expires_at: float, analysis: Dict[str, Any]):
+        self._memory[key] = (expires_at, analysis)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _check_policy(self, policy_id: str, policy_hash: str) -> bool:
+        """
+        记录政策的内容哈希，内容变化时删除内存中该政策的旧记录
+
+        返回是否需要同时清理SQLite中的旧记录（本进程首次见到该哈希时）。调用时须持有 _lock。
+        """
+        known = self._policy_hashes.get(policy_id)
+        if known == policy_hash:
+            return False
+        self._policy_hashes[policy_id] = policy_hash
+        if known is not None:
+            self._memory = OrderedDict(
+                (key, entry) for key, entry in self._memory.items() if entry[1].get("_policy_hash") != known
+            )
+        return True
+
+    def _purge_policy(self, db: sqlite3.Connection, policy_id: str, policy_hash: str):
+        db.execute(
+            "DELETE FROM analysis_cache WHERE policy_id = ? AND policy_hash != ?",
+            (policy_id, policy_hash)
+        )
+
+    def _get_memory(self, key: str, policy_id: str, policy_hash: str) -> Optional[Dict[str, Any]]:
+        """只查内存一级缓存（不做IO）；政策内容哈希尚未核对时返回None，交给 _get 处理"""
+        now = time.time()
+        with self._lock:
+            if self._policy_hashes.get(policy_id) != policy_hash:
+                return None
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if entry[0] > now:
+                self._memory.move_to_end(key)
+                return entry[1]
+            del self._memory[key]
+            return None
+
+    def _get(self, key: str, policy_id: str, policy_hash: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            purge = self._check_policy(policy_id, policy_hash)
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] > now:
+                self._memory.move_to_end(key)
+                return entry[1]
+
+        with self._db_lock:
+            db = self._connect()
+            if purge:
+                self._purge_policy(db, policy_id, policy_hash)
+                db.commit()
+            row = db.execute(
+                "SELECT analysis, expires_at FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] <= now:
+            return None
+        analysis = json.loads(row[0])
+        with self._lock:
+            self._remember(key, row[1], analysis)
+        return analysis
+
+    def _set(self, key: str, policy_id: str, policy_hash: str, analysis: Dict[str, Any]):
+        expires_at = time.time() + self.ttl
+        entry = dict(analysis, _policy_hash=policy_hash)
+        with self._lock:
+            purge = self._check_policy(policy_id, policy_hash)
+            self._remember(key, expires_at, entry)
+        with self._db_lock:
+            db = self._connect()
+            if purge:
+                self._purge_policy(db, policy_id, policy_hash)
+            db.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, policy_id, policy_hash, analysis, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, policy_id, policy_hash, json.dumps(entry, ensure_ascii=False), expires_at)
+            )
+            db.commit()
+
+    async def get(self, key: str, policy_id: str, policy_hash: str) -> Optional[Dict[str, Any]]:
+        """读取缓存的分析结果，未命中或已过期返回None（内存命中时直接返回，只有需要查SQLite时才进入线程池）"""
+        entry = self._get_memory(key, policy_id, policy_hash)
+        if entry is None:
+            try:
+                entry = await asyncio.to_thread(self._get, key, policy_id, policy_hash)
+            except sqlite3.Error as e:
+                logger.error(f"读取分析缓存失败: {e}")
+                entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {name: value for name, value in entry.items() if name != "_policy_hash"}
+
+    async def set(self, key: str, policy_id: str, policy_hash: str, analysis: Dict[str, Any]):
+        """写入分析结果"""
+        try:
+            await asyncio.to_thread(self._set, key, policy_id, policy_hash, analysis)
+        except sqlite3.Error as e:
+            logger.error(f"写入分析缓存失败: {e}")
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
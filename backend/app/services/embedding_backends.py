@@ -0,0 +1,170 @@
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 可选的向量推理后端：
+#   sentence-transformers  原始 PyTorch 模型（全精度，作为参考）
+#   onnx                   导出为 ONNX，由 ONNX Runtime 在CPU上推理
+#   onnx-int8              ONNX 模型经动态 int8 量化（权重int8，激活运行时量化）
+EMBEDDING_BACKENDS = ("sentence-transformers", "onnx", "onnx-int8")
+
+_ONNX_FILE = "model.onnx"
+_ONNX_INT8_FILE = "model.int8.onnx"
+
+
+def model_source(model_name: str, model_path: str = "") -> str:
+    """本地模型目录存在时从本地加载，否则按模型名下载"""
+    return model_path if model_path and os.path.isdir(model_path) else model_name
+
+
+def export_onnx_model(source: str, output_dir: str, quantize: bool = True) -> str:
+    """
+    把 BERT 结构的向量模型导出为 ONNX（可选同时生成动态 int8 量化版本）
+
+    需要 torch、transformers 和 onnxruntime。分词器配置一并保存到 output_dir。
+    先导出到同一目录下的临时目录，再逐个原子替换到 output_dir（模型文件最后替换），
+    其他进程不会读到写了一半的模型。返回 output_dir。
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(source)
+    model = AutoModel.from_pretrained(source).eval()
+
+    sample = tokenizer(["政策匹配"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    staging_dir = tempfile.mkdtemp(dir=output_dir, prefix=".export-")
+    try:
+        staged_path = os.path.join(staging_dir, _ONNX_FILE)
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                staged_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14
+            )
+        tokenizer.save_pretrained(staging_dir)
+
+        model_files = [_ONNX_FILE]
+        if quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            quantize_dynamic(staged_path, os.path.join(staging_dir, _ONNX_INT8_FILE), weight_type=QuantType.QInt8)
+            model_files.append(_ONNX_INT8_FILE)
+
+        # 分词器文件先就位，模型文件是否存在用来判断导出是否完成，最后替换
+        for name in sorted(os.listdir(staging_dir), key=lambda name: name in model_files):
+            os.replace(os.path.join(staging_dir, name), os.path.join(output_dir, name))
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    logger.info(f"ONNX模型已导出: {os.path.join(output_dir, _ONNX_FILE)}")
+    if quantize:
+        logger.info(f"int8量化模型已生成: {os.path.join(output_dir, _ONNX_INT8_FILE)}")
+    return output_dir
+
+
+@contextmanager
+def _export_lock(output_dir: str) -> Iterator[None]:
+    """跨进程的导出锁：多个 worker 同时首次使用ONNX后端时只有一个进行导出"""
+    import fcntl
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, ".export.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class OnnxEmbeddingModel:
+    """
+    ONNX Runtime 向量模型
+
+    与 BGE 的 sentence-transformers 配置一致：取 [CLS] 位置的隐藏状态并做 L2 归一化。
+    encode 的接口与 SentenceTransformer.encode 相同，可直接替换。
+    """
+
+    def __init__(self, model_dir: str, file_name: str = _ONNX_INT8_FILE, max_length: int = 512, threads: int = 0):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+
+        self.path = os.path.join(model_dir, file_name)
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = ort.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    def encode(self, sentences: Sequence[str], batch_size: int = 32, **kwargs: Any) -> np.ndarray:
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        batches: List[np.ndarray] = []
+        for start in range(0, len(sentences), batch_size):
+            tokens = self.tokenizer(
+                list(sentences[start:start + batch_size]),
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np"
+            )
+            feeds = {name: tokens[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(["last_hidden_state"], feeds)[0]
+            batches.append(hidden[:, 0])
+        if not batches:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        vectors = np.concatenate(batches).astype(np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+def load_embedding_model(
+    backend: str,
+    model_name: str,
+    model_path: str = "",
+    onnx_dir: str = "",
+    max_length: int = 512,
+    threads: int = 0
+) -> Any:
+    """
+    按后端名称加载向量模型，返回带 encode(sentences, batch_size) 方法的对象
+
+    ONNX 后端首次使用时从原始模型导出到 onnx_dir，之后直接加载导出的文件。
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"未知的向量推理后端: {backend}，可选: {', '.join(EMBEDDING_BACKENDS)}")
+
+    source = model_source(model_name, model_path)
+    if backend == "sentence-transformers":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(source)
+
+    file_name = _ONNX_INT8_FILE if backend == "onnx-int8" else _ONNX_FILE
+    onnx_dir = onnx_dir or f"{source.rstrip('/')}-onnx"
+    if not os.path.exists(os.path.join(onnx_dir, file_name)):
+        with _export_lock(onnx_dir):
+            # 等待锁期间其他 worker 可能已完成导出
+            if not os.path.exists(os.path.join(onnx_dir, file_name)):
+                logger.info(f"未找到 {file_name}，从 {source} 导出ONNX模型")
+                export_onnx_model(source, onnx_dir, quantize=backend == "onnx-int8")
+    return OnnxEmbeddingModel(onnx_dir, file_name, max_length=max_length, threads=threads)
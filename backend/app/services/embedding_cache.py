@@ -0,0 +1,133 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    查询向量缓存
+
+    按 (模型, 查询文本) 缓存向量，以 float16/float32 紧凑数组存放在进程内LRU中；
+    设置 path 时同时写入SQLite文件，进程重启后仍可命中，完全跳过推理。
+    读取时统一返回 float32 向量。
+    """
+
+    def __init__(self, model_id: str, path: str = "", max_entries: int = 4096, dtype: str = "float16"):
+        self.model_id = model_id
+        self.path = path
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # _lock 只保护内存LRU（不在持有时做IO，事件循环中可直接获取）；_db_lock 串行化SQLite访问
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_id}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    key TEXT PRIMARY KEY,
+                    model_id TEXT NOT NULL,
+                    dtype TEXT NOT NULL,
+                    vector BLOB NOT NULL
+                )
+            """)
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[np.ndarray]:
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT dtype, vector FROM embedding_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        vector = np.frombuffer(row[1], dtype=np.dtype(row[0])).astype(self.dtype)
+        with self._lock:
+            self._remember(key, vector)
+        return vector
+
+    def _store(self, key: str, vector: np.ndarray):
+        with self._db_lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO embedding_cache (key, model_id, dtype, vector) VALUES (?, ?, ?, ?)",
+                (key, self.model_id, self.dtype.str, vector.tobytes())
+            )
+            db.commit()
+
+    async def get(self, text: str) -> Optional[np.ndarray]:
+        """读取缓存的向量，未命中返回None"""
+        key = self.key(text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+        if vector is None and self.path:
+            try:
+                vector = await asyncio.to_thread(self._load, key)
+            except sqlite3.Error as e:
+                logger.error(f"读取向量缓存失败: {e}")
+
+        if vector is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return vector.astype(np.float32)
+
+    async def set(self, text: str, vector: np.ndarray):
+        """写入向量"""
+        key = self.key(text)
+        vector = np.asarray(vector, dtype=self.dtype)
+        with self._lock:
+            self._remember(key, vector)
+        if self.path:
+            try:
+                await asyncio.to_thread(self._store, key, vector)
+            except sqlite3.Error as e:
+                logger.error(f"写入向量缓存失败: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "model_id": self.model_id,
+            "persistent": bool(self.path),
+            "dtype": self.dtype.name,
+            "entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingWorker:
+    """
+    微批量向量推理器
+
+    encode 只把文本放入队列并等待各自的 future；后台任务把同一时间段内的请求
+    凑成一批（达到 max_batch_size 条或等待超过 max_wait 秒），在专用推理线程中
+    做一次批量前向计算，再把每行向量分发给对应的调用方。推理不在事件循环中执行，
+    不会阻塞其他请求；队列满时 encode 等待，对请求形成背压。
+    """
+
+    def __init__(
+        self,
+        model: Any = None,
+        max_batch_size: int = 32,
+        max_wait: float = 0.005,
+        max_queue_size: int = 1024
+    ):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue_size = max_queue_size
+
+        self.queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self.batches_total = 0
+        self.texts_total = 0
+        self.last_batch_size = 0
+        self.max_batch_seen = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, model: Any = None):
+        """启动后台凑批任务（需在事件循环中调用），可同时更换模型"""
+        if model is not None:
+            self.model = model
+        if self.running:
+            return
+        if self._executor is None:
+            # 单个推理线程：批内并行由模型自身完成，多个线程同时前向计算只会争抢CPU
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+        self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"向量推理器已启动: max_batch_size={self.max_batch_size}, max_wait={self.max_wait}")
+
+    async def encode(self, text: str) -> np.ndarray:
+        """计算单条文本的向量；与同时到达的其他请求合并为一批推理"""
+        if self.model is None:
+            raise RuntimeError("向量模型未加载")
+        if not self.running:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        queue = self.queue
+        await queue.put((text, future))
+        if queue is not self.queue or not self.running:
+            # 等待入队期间推理器已停止，这个队列不会再被处理
+            self._fail(future)
+        return await future
+
+    async def stop(self):
+        """
+        取消后台任务并结束所有未完成的请求
+
+        队列中和正在推理的请求都收到 RuntimeError，调用方不会在关闭时一直等待。
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self.queue is not None and not self.queue.empty():
+            _, future = self.queue.get_nowait()
+            self._fail(future)
+        self.queue = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    @staticmethod
+    def _fail(future: asyncio.Future):
+        if not future.done():
+            future.set_exception(RuntimeError("向量推理器已停止"))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        batch: List[Tuple[str, asyncio.Future]] = []
+        try:
+            while True:
+                batch = [await self.queue.get()]
+
+                # 凑批：达到条数上限或等待超过 max_wait 即推理
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    if not self.queue.empty():
+                        batch.append(self.queue.get_nowait())
+                        continue
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                # 已取消的调用方（如客户端断开）不再参与推理
+                batch = [(text, future) for text, future in batch if not future.done()]
+                if batch:
+                    await self._encode_batch(loop, batch)
+                batch = []
+        except asyncio.CancelledError:
+            # 停止时已取出队列的请求（凑批中或推理中）同样需要结束
+            for _, future in batch:
+                self._fail(future)
+            raise
+
+    async def _encode_batch(self, loop: asyncio.AbstractEventLoop, batch: List[Tuple[str, asyncio.Future]]):
+        texts = [text for text, _ in batch]
+        try:
+            vectors = await loop.run_in_executor(self._executor, self._forward, texts)
+        except Exception as e:
+            logger.error(f"批量向量推理失败: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches_total += 1
+        self.texts_total += len(batch)
+        self.last_batch_size = len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def _forward(self, texts: Sequence[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(list(texts), batch_size=len(texts)))
+
+    def stats(self) -> Dict[str, Any]:
+        """推理统计，用于调整批大小和等待时间"""
+        return {
+            "running": self.running,
+            "max_batch_size": self.max_batch_size,
+            "max_wait": self.max_wait,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "max_queue_size": self.max_queue_size,
+            "batches_total": self.batches_total,
+            "texts_total": self.texts_total,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size_seen": self.max_batch_seen,
+            "avg_batch_size": round(self.texts_total / self.batches_total, 2) if self.batches_total else 0.0
+        }
@@ -0,0 +1,117 @@
+import importlib.util
+import logging
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 需要 h2 包（httpx[http2]），未安装时使用 HTTP/1.1 长连接
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class SharedHTTPClient:
+    """
+    进程内共享的 httpx.AsyncClient
+
+    所有对 DeepSeek 的调用复用同一个连接池（长连接，可用时启用 HTTP/2 多路复用），
+    避免每次请求重新建立 TCP/TLS 连接。应用启动时 start、关闭时 close；
+    未启动时首次使用会按当前配置自动创建（便于脚本直接调用）。
+    读取超时在每个调用处按路由单独传入（用 timeout() 构造，保留连接超时）。
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        connect_timeout: float = 10.0,
+        http2: bool = True
+    ):
+        self.configure(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+            connect_timeout=connect_timeout,
+            http2=http2
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self.requests_total = 0
+
+    def configure(self, **options: Any):
+        """更新连接池配置，在下一次创建客户端时生效"""
+        for name, value in options.items():
+            setattr(self, name, value)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = self._create()
+        return self._client
+
+    def _create(self) -> httpx.AsyncClient:
+        http2 = self.http2 and HTTP2_AVAILABLE
+        if self.http2 and not HTTP2_AVAILABLE:
+            logger.warning("未安装 h2，共享HTTP客户端使用 HTTP/1.1")
+        logger.info(
+            f"共享HTTP客户端已创建: max_connections={self.max_connections}, "
+            f"max_keepalive={self.max_keepalive_connections}, http2={http2}"
+        )
+        return httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry
+            ),
+            # 读取超时由各调用处按路由传入，这里只设置默认值
+            timeout=httpx.Timeout(60.0, connect=self.connect_timeout),
+            event_hooks={"request": [self._on_request]}
+        )
+
+    def timeout(self, read: float, connect: Optional[float] = None) -> httpx.Timeout:
+        """
+        单次请求的超时
+
+        按请求传入的 timeout 会整体替换客户端默认的 httpx.Timeout，直接传浮点数时
+        连接超时也变成该值。这里构造只改变读取、写入和连接池等待时间的超时对象，
+        连接超时默认使用连接池配置。
+        """
+        return httpx.Timeout(read, connect=self.connect_timeout if connect is None else connect)
+
+    async def _on_request(self, request: httpx.Request):
+        self.requests_total += 1
+
+    async def start(self, **options: Any):
+        """应用启动时创建客户端"""
+        self.configure(**options)
+        await self.close()
+        self._client = self._create()
+
+    async def close(self):
+        """应用关闭时关闭全部连接"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        """连接池统计，用于调整连接池大小"""
+        # httpx 未公开连接池对象，这里读取 httpcore 连接池的连接列表
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "started": self._client is not None and not self._client.is_closed,
+            "http2": self.http2 and HTTP2_AVAILABLE,
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections,
+            "keepalive_expiry": self.keepalive_expiry,
+            "requests_total": self.requests_total,
+            "connections": len(connections),
+            "active_connections": len(connections) - idle,
+            "idle_connections": idle
+        }
+
+
+# 创建全局共享客户端（由应用在启动时按配置 start）
+shared_http_client = SharedHTTPClient()
@@ -0,0 +1,104 @@
+import json
+from collections.abc import Mapping
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# orjson 3.9+ 可以把预编码片段原样嵌入输出，否则由下方的回退编码器拼接
+_NATIVE_FRAGMENT = ORJSON_AVAILABLE and hasattr(orjson, "Fragment")
+
+
+class _Fragment:
+    """预编码的JSON片段，编码时原样输出"""
+
+    __slots__ = ("contents",)
+
+    def __init__(self, contents: bytes):
+        self.contents = contents
+
+
+RawJSON = orjson.Fragment if _NATIVE_FRAGMENT else _Fragment
+
+
+def _default(obj: Any):
+    if isinstance(obj, Mapping):
+        # 紧凑政策记录等只读映射
+        return dict(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if hasattr(obj, "item"):
+        # NumPy 标量
+        return obj.item()
+    if hasattr(obj, "dict"):
+        # pydantic 模型
+        return obj.dict()
+    raise TypeError(f"无法序列化的类型: {type(obj).__name__}")
+
+
+def _leaf(obj: Any) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def _encode(obj: Any, out: list):
+    """逐层编码容器，遇到预编码片段直接拼接其字节"""
+    if isinstance(obj, _Fragment):
+        out.append(obj.contents)
+    elif isinstance(obj, Mapping):
+        out.append(b"{")
+        for i, (key, value) in enumerate(obj.items()):
+            if i:
+                out.append(b",")
+            out.append(_leaf(str(key)))
+            out.append(b":")
+            _encode(value, out)
+        out.append(b"}")
+    elif isinstance(obj, (list, tuple)):
+        out.append(b"[")
+        for i, value in enumerate(obj):
+            if i:
+                out.append(b",")
+            _encode(value, out)
+        out.append(b"]")
+    else:
+        out.append(_leaf(obj))
+
+
+def dumps(obj: Any) -> bytes:
+    """编码为紧凑的UTF-8 JSON字节，可包含 RawJSON 预编码片段"""
+    if _NATIVE_FRAGMENT:
+        return _leaf(obj)
+    out: list = []
+    _encode(obj, out)
+    return b"".join(out)
+
+
+def dumps_members(obj: dict) -> bytes:
+    """编码对象的成员部分（去掉首尾花括号），用于与其他片段拼接成一个对象"""
+    return dumps(obj)[1:-1]
+
+
+def join_object(*members: bytes) -> "RawJSON":
+    """把若干成员片段拼接为一个对象片段（空片段跳过）"""
+    return RawJSON(b"{" + b",".join(member for member in members if member) + b"}")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    使用 orjson（未安装时回退到标准库）编码的JSON响应
+
+    端点直接返回该响应时，FastAPI 不再对内容做 jsonable_encoder 转换，
+    内容中的 RawJSON 片段原样输出。
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
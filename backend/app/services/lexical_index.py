@@ -0,0 +1,202 @@
+import math
+import re
+import sys
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# 连续的汉字片段，或连续的字母数字（英文单词、数字按整词处理）
+_TOKEN_RUN = re.compile(r"[一-鿿]+|[a-z0-9]+")
+
+
+def char_ngrams(text: str, n: int = 2) -> List[str]:
+    """
+    字符 n-gram 分词
+
+    汉字片段切为重叠的 n 字片段（不足 n 字的片段整体作为一个词），
+    字母数字按整词处理并转为小写。无需分词词典，"专精特新"、"小巨人"等术语
+    拆成的片段与正文中的同一术语完全一致。
+    """
+    tokens = []
+    for run in _TOKEN_RUN.findall(text.lower()):
+        if run[0] < "一" or len(run) <= n:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + n] for i in range(len(run) - n + 1))
+    return tokens
+
+
+class _Postings:
+    """一个词的倒排表：文档序号和词频两个紧凑数组，新增的条目先追加到缓冲区"""
+
+    __slots__ = ("docs", "tfs", "pending_docs", "pending_tfs")
+
+    def __init__(self):
+        self.docs = np.zeros(0, dtype=np.int32)
+        self.tfs = np.zeros(0, dtype=np.float32)
+        self.pending_docs: List[int] = []
+        self.pending_tfs: List[float] = []
+
+    def append(self, doc: int, tf: float):
+        self.pending_docs.append(doc)
+        self.pending_tfs.append(tf)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self.pending_docs:
+            self.docs = np.concatenate([self.docs, np.asarray(self.pending_docs, dtype=np.int32)])
+            self.tfs = np.concatenate([self.tfs, np.asarray(self.pending_tfs, dtype=np.float32)])
+            self.pending_docs, self.pending_tfs = [], []
+        return self.docs, self.tfs
+
+    def compact(self, alive: np.ndarray, remap: np.ndarray):
+        """删除已删除文档的条目，文档序号换为压缩后的序号"""
+        docs, tfs = self.arrays()
+        keep = alive[docs]
+        self.docs, self.tfs = remap[docs[keep]], tfs[keep]
+
+
+class LexicalIndex:
+    """
+    BM25 倒排索引（字符 n-gram）
+
+    每个政策按字段加权（标题、标签、正文）统计词频，文档内部按序号编号，
+    倒排表为 int32 / float32 数组。upsert / remove 增量更新：更新即删除旧文档
+    再追加新文档，删除只做标记，标记的文档超过 compact_ratio 时压缩倒排表
+    并重新编号，文档数组只保留有效文档。
+    """
+
+    def __init__(self, n: int = 2, k1: float = 1.2, b: float = 0.75, compact_ratio: float = 0.25):
+        self.n = n
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+
+        self._postings: Dict[str, _Postings] = {}
+        self._df: Counter = Counter()
+        self._positions: Dict[str, int] = {}
+        self._doc_ids: List[str] = []
+        self._doc_terms: List[Tuple[str, ...]] = []
+        # 文档长度和有效标记按容量预分配，前 len(self._doc_ids) 个有效
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._norms: Optional[np.ndarray] = None
+        self._total_length = 0.0
+        self._deleted = 0
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, doc_id: object) -> bool:
+        return doc_id in self._positions
+
+    def upsert(self, doc_id: str, fields: Iterable[Tuple[str, float]]):
+        """
+        新增或更新文档
+
+        fields 为 (文本, 权重) 序列，词频按权重累加。
+        """
+        self.remove(doc_id)
+        frequencies: Counter = Counter()
+        for text, weight in fields:
+            for token in char_ngrams(text or "", self.n):
+                frequencies[token] += weight
+
+        doc = len(self._doc_ids)
+        terms = tuple(sys.intern(token) for token in frequencies)
+        for token in terms:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = _Postings()
+            postings.append(doc, frequencies[token])
+            self._df[token] += 1
+
+        if doc == len(self._lengths):
+            self._resize(max(16, 2 * doc))
+        length = float(sum(frequencies.values()))
+        self._positions[doc_id] = doc
+        self._doc_ids.append(doc_id)
+        self._doc_terms.append(terms)
+        self._lengths[doc] = length
+        self._alive[doc] = True
+        self._total_length += length
+        self._norms = None
+
+    def _resize(self, capacity: int):
+        size = len(self._doc_ids)
+        lengths = np.zeros(capacity, dtype=np.float32)
+        alive = np.zeros(capacity, dtype=bool)
+        lengths[:size] = self._lengths[:size]
+        alive[:size] = self._alive[:size]
+        self._lengths, self._alive = lengths, alive
+
+    def remove(self, doc_id: str):
+        """删除文档（不存在时忽略）"""
+        doc = self._positions.pop(doc_id, None)
+        if doc is None:
+            return
+        self._alive[doc] = False
+        self._total_length -= self._lengths[doc]
+        for token in self._doc_terms[doc]:
+            self._df[token] -= 1
+        self._doc_terms[doc] = ()
+        self._deleted += 1
+        self._norms = None
+        if self._deleted > self.compact_ratio * len(self._doc_ids):
+            self.compact()
+
+    def compact(self):
+        """移除已删除的文档，有效文档按原顺序重新编号"""
+        size = len(self._doc_ids)
+        alive = self._alive[:size].copy()
+        keep = np.flatnonzero(alive)
+        remap = np.full(size, -1, dtype=np.int32)
+        remap[keep] = np.arange(len(keep), dtype=np.int32)
+        for token in list(self._postings):
+            if self._df[token] <= 0:
+                del self._postings[token]
+                del self._df[token]
+            else:
+                self._postings[token].compact(alive, remap)
+
+        lengths = self._lengths[keep]
+        self._doc_ids = [self._doc_ids[i] for i in keep]
+        self._doc_terms = [self._doc_terms[i] for i in keep]
+        self._positions = {doc_id: doc for doc, doc_id in enumerate(self._doc_ids)}
+        self._lengths = np.zeros(max(16, 2 * len(keep)), dtype=np.float32)
+        self._alive = np.zeros(len(self._lengths), dtype=bool)
+        self._lengths[:len(keep)] = lengths
+        self._alive[:len(keep)] = True
+        self._norms = None
+        self._deleted = 0
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """按 BM25 分数返回前 top_k 个 (文档ID, 分数)，分数为0的文档不返回"""
+        count = len(self._positions)
+        if not count or top_k <= 0:
+            return []
+        tokens = set(char_ngrams(query, self.n))
+        if not tokens:
+            return []
+
+        size = len(self._doc_ids)
+        if self._norms is None:
+            # BM25 长度归一项只随文档增删变化，在两次更新之间复用
+            self._norms = self.k1 * (1 - self.b + self.b * self._lengths[:size] / (self._total_length / count))
+        norms = self._norms
+        scores = np.zeros(size, dtype=np.float32)
+        for token in tokens:
+            postings = self._postings.get(token)
+            df = self._df.get(token, 0)
+            if postings is None or df <= 0:
+                continue
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            docs, tfs = postings.arrays()
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norms[docs])
+        scores[~self._alive[:size]] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self._doc_ids[i], float(scores[i])) for i in candidates]
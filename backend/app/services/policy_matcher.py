@@ -1,84 +1,473 @@
 import asyncio
 import time
-from typing import List, Dict, Any, Tuple
-import chromadb
-from chromadb.config import Settings as ChromaSettings
+from datetime import datetime
+from typing import AsyncIterator, Iterable, List, Dict, Any, Optional, Tuple
 import httpx
 import json
 import logging
-from sentence_transformers import SentenceTransformer
 
-from ..models.schemas import CompanyProfile, PolicyMatch, PolicyInfo
-from ..database import get_db, Policy
+from ..models.schemas import CompanyProfile, PolicyMatch, PolicyInfo, ScoreSource
+from ..database import AsyncSessionLocal, Policy
 from ..config import settings
-from sqlalchemy.ext.asyncio import AsyncSession
+from .analysis_cache import AnalysisCache, content_hash
+from .single_flight import SingleFlight
+from .embedding_backends import load_embedding_model
+from .embedding_cache import EmbeddingCache
+from .embedding_worker import EmbeddingWorker
+from .http_client import shared_http_client
+from .lexical_index import LexicalIndex
+from .vector_store import VectorStore, open_vector_store
 from sqlalchemy import select
 
 logger = logging.getLogger(__name__)
 
+# 分析提示版本：修改 _build_analysis_prompt 的内容或输出格式时递增，使旧的缓存结果失效
+ANALYSIS_PROMPT_VERSION = "v1"
+
+# 规则分析的基础分数：规则分数 = 基础分数 + 地区、产业、认定的命中加分
+RULE_BASE_SCORE = 0.5
+
+ANALYSIS_SYSTEM_PROMPT = "你是一个专业的政策分析师，擅长分析企业与政策的匹配度。请严格按照JSON格式返回分析结果。"
+
+
+# 产业类型对应的关键词（规则评分和关键词召回共用）
+INDUSTRY_KEYWORDS = {
+    "ai-tech": ["AI", "人工智能", "科技", "技术"],
+    "manufacturing": ["制造", "生产", "工业"],
+    "service": ["服务", "商业"],
+    "other": []
+}
+
+# 企业认定对应的政策术语（关键词召回）
+CERTIFICATION_TERMS = {
+    "high-tech": ["高新技术企业"],
+    "specialized": ["专精特新"],
+    "little-giant": ["专精特新", "小巨人"],
+    "listed": ["上市"]
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计token数：中文约每字1个token，英文和数字约每3个字符1个token"""
+    return len(text.encode("utf-8")) // 3 + 1
+
 class PolicyMatcherService:
     """政策匹配服务"""
     
     def __init__(self):
-        # 初始化ChromaDB
-        self.chroma_client = chromadb.Client(ChromaSettings(
-            chroma_db_impl="duckdb+parquet",
-            persist_directory="./chromadb"
-        ))
+        # 向量库和BGE模型加载耗时较长，由 start_warm_up 在后台预热，不阻塞进程启动
+        self.vector_store: Optional[VectorStore] = None
+        self.embedding_model = None
+        self.components: Dict[str, str] = {
+            "vector_store": "pending", "embedding_model": "pending", "lexical_index": "pending"
+        }
+        self._warm_up_task: Optional[asyncio.Task] = None
+        
+        # 关键词倒排索引：与向量召回融合，向量召回不可用时单独召回
+        self.lexical_index = LexicalIndex()
+        self._lexical_synced_at: Optional[datetime] = None
+        self._lexical_attempted_at: Optional[datetime] = None
+        self._lexical_refresh_task: Optional[asyncio.Task] = None
         
-        # 获取或创建集合
+        # 查询向量推理器：并发的查询合并为一批，在推理线程中计算
+        self.embedding_worker = EmbeddingWorker(
+            max_batch_size=settings.EMBEDDING_BATCH_SIZE,
+            max_wait=settings.EMBEDDING_BATCH_WAIT,
+            max_queue_size=settings.EMBEDDING_QUEUE_SIZE
+        )
+        
+        # 查询向量缓存：企业画像描述重复率高，命中时跳过推理
+        self.embedding_cache = EmbeddingCache(
+            model_id=f"{settings.BGE_MODEL_NAME}:{settings.EMBEDDING_BACKEND}",
+            path=settings.EMBEDDING_CACHE_PATH,
+            max_entries=settings.EMBEDDING_CACHE_SIZE,
+            dtype=settings.EMBEDDING_CACHE_DTYPE
+        )
+        
+        # 限制同时进行的DeepSeek分析请求数（所有匹配请求共享）
+        self.analysis_semaphore = asyncio.Semaphore(settings.MATCH_ANALYSIS_CONCURRENCY)
+        
+        # 相同提示的并发分析请求合并为一次DeepSeek调用
+        self.analysis_flights = SingleFlight()
+        
+        # AI分析结果缓存（内存LRU + SQLite）
+        self.analysis_cache = AnalysisCache(
+            path=settings.ANALYSIS_CACHE_PATH,
+            max_entries=settings.ANALYSIS_CACHE_SIZE,
+            ttl=settings.ANALYSIS_CACHE_TTL
+        )
+    
+    @property
+    def ready(self) -> bool:
+        """向量召回所需的组件是否都已就绪"""
+        return self.components["vector_store"] == "ready" and self.components["embedding_model"] == "ready"
+    
+    def readiness(self) -> Dict[str, Any]:
+        """各组件的预热状态：pending / warming / ready / failed"""
+        return {
+            "ready": self.ready,
+            "components": dict(self.components),
+            "lexical_documents": len(self.lexical_index)
+        }
+    
+    async def shutdown(self):
+        """应用关闭时停止后台任务和向量推理器，等待中的查询向量请求立即结束"""
+        for task in (self._warm_up_task, self._lexical_refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+        await self.embedding_worker.stop()
+    
+    def start_warm_up(self):
+        """在后台预热向量库和BGE模型（需在事件循环中调用，重复调用无副作用）"""
+        if self._warm_up_task is None:
+            self._warm_up_task = asyncio.create_task(self.warm_up())
+    
+    async def warm_up(self):
+        """并行加载向量库、BGE模型和关键词索引，加载在线程池中进行，不阻塞事件循环"""
+        await asyncio.gather(
+            self._warm_component("vector_store", self._open_vector_store),
+            self._warm_component("embedding_model", self._load_embedding_model),
+            self._warm_component("lexical_index", self.refresh_lexical_index)
+        )
+    
+    async def _warm_component(self, name: str, loader):
+        self.components[name] = "warming"
+        started = time.time()
         try:
-            self.collection = self.chroma_client.get_collection(
-                name=settings.CHROMADB_COLLECTION
-            )
-        except Exception:
-            self.collection = self.chroma_client.create_collection(
-                name=settings.CHROMADB_COLLECTION,
-                metadata={"hnsw:space": "cosine"}
-            )
+            if asyncio.iscoroutinefunction(loader):
+                await loader()
+            else:
+                await asyncio.to_thread(loader)
+        except Exception as e:
+            self.components[name] = "failed"
+            logger.warning(f"{name}预热失败: {e}")
+            return
+        self.components[name] = "ready"
+        logger.info(f"{name}预热完成，耗时: {time.time() - started:.2f}秒")
+    
+    def _open_vector_store(self):
+        # 按 VECTOR_STORE 打开ChromaDB集合或内存映射的向量文件
+        self.vector_store = open_vector_store(
+            settings.VECTOR_STORE,
+            collection_name=settings.CHROMADB_COLLECTION,
+            path=settings.VECTOR_STORE_PATH
+        )
+        logger.info(f"向量库已打开: {self.vector_store.name}，{self.vector_store.count()} 条向量")
+    
+    def _load_embedding_model(self):
+        # 按 EMBEDDING_BACKEND 初始化BGE模型，并做一次前向计算（首次推理较慢）
+        model = load_embedding_model(
+            settings.EMBEDDING_BACKEND,
+            settings.BGE_MODEL_NAME,
+            model_path=settings.BGE_MODEL_PATH,
+            onnx_dir=settings.EMBEDDING_ONNX_DIR,
+            max_length=settings.EMBEDDING_MAX_LENGTH,
+            threads=settings.EMBEDDING_THREADS
+        )
+        model.encode(["预热"])
+        self.embedding_model = model
+        self.embedding_worker.model = model
+    
+    async def refresh_lexical_index(self):
+        """
+        增量同步关键词索引
+        
+        只读取上次同步之后更新过的政策：有效的重新索引，失效的删除。
+        首次同步在线程池中建立完整索引后整体替换。
+        """
+        synced_at = self._lexical_attempted_at = datetime.now()
+        async with AsyncSessionLocal() as session:
+            stmt = select(Policy)
+            if self._lexical_synced_at is not None:
+                stmt = stmt.where(Policy.updated_at >= self._lexical_synced_at)
+            else:
+                stmt = stmt.where(Policy.is_active == True)
+            result = await session.execute(stmt)
+            policies = list(result.scalars().all())
         
-        # 初始化BGE模型
+        if self._lexical_synced_at is None:
+            index = LexicalIndex()
+            await asyncio.to_thread(self._index_policies, index, policies)
+            self.lexical_index = index
+        else:
+            self._index_policies(self.lexical_index, policies)
+        self._lexical_synced_at = synced_at
+        if policies:
+            logger.info(f"关键词索引已同步{len(policies)}个政策，共{len(self.lexical_index)}个")
+    
+    def _index_policies(self, index: LexicalIndex, policies: List[Policy]):
+        for policy in policies:
+            if not policy.is_active:
+                index.remove(str(policy.id))
+                continue
+            # 标题、标签权重高于正文
+            index.upsert(str(policy.id), [
+                (policy.policy_name, 3.0),
+                (" ".join(policy.industry_tags or []), 2.0),
+                (policy.content, 1.0)
+            ])
+    
+    def _schedule_lexical_refresh(self):
+        """
+        索引超过 LEXICAL_INDEX_REFRESH_INTERVAL 未同步时在后台同步
+        
+        首次同步（预热）失败时，每隔 LEXICAL_INDEX_RETRY_INTERVAL 重试，直到建立索引。
+        """
+        if self._lexical_attempted_at is None or self.components["lexical_index"] == "warming" or (
+            self._lexical_refresh_task is not None and not self._lexical_refresh_task.done()
+        ):
+            return
+        if self._lexical_synced_at is None:
+            interval = settings.LEXICAL_INDEX_RETRY_INTERVAL
+        else:
+            interval = settings.LEXICAL_INDEX_REFRESH_INTERVAL
+        if (datetime.now() - self._lexical_attempted_at).total_seconds() >= interval:
+            self._lexical_refresh_task = asyncio.create_task(self._run_lexical_refresh())
+    
+    async def _run_lexical_refresh(self):
+        if self._lexical_synced_at is None:
+            # 重试首次同步，成功后关键词召回组件变为 ready
+            await self._warm_component("lexical_index", self.refresh_lexical_index)
+            return
         try:
-            self.embedding_model = SentenceTransformer(settings.BGE_MODEL_NAME)
+            await self.refresh_lexical_index()
         except Exception as e:
-            logger.warning(f"无法加载BGE模型: {e}")
-            self.embedding_model = None
+            logger.warning(f"关键词索引同步失败: {e}")
     
     async def match_policies(
         self, 
         company_profile: CompanyProfile, 
         top_k: int = 5,
-        min_score: float = 0.3
+        min_score: float = 0.3,
+        llm_budget: Optional[int] = None
     ) -> List[PolicyMatch]:
-        """匹配政策"""
+        """
+        匹配政策
+        
+        分级进行：向量召回 + 关键词召回（倒数排名融合）→ 规则预评分 → 只对最有希望的
+        候选做AI分析。llm_budget 为本次请求最多进行AI分析的政策数，默认使用
+        MATCH_LLM_BUDGET，为0时只使用规则评分。
+        
+        向量库或BGE模型尚未就绪时不等待预热，只用关键词召回；关键词召回也没有结果时，
+        取最近更新的 MATCH_DEGRADED_CANDIDATES 个有效政策，只用规则评分（score_source 为 rule）。
+        """
         start_time = time.time()
         
         try:
-            # 1. 生成企业画像描述
-            company_description = self._generate_company_description(company_profile)
+            # 1-4. 召回候选并做规则预评分
+            llm_policies, rule_matches = await self._select_candidates(company_profile, top_k, min_score, llm_budget)
             
-            # 2. 向量搜索相似政策
-            similar_policies = await self._vector_search(company_description, top_k * 2)
+            # 5. AI分析匹配度
+            matches = await self._analyze_matches(company_profile, llm_policies) + rule_matches
             
-            # 3. 获取政策详细信息
-            policy_details = await self._get_policy_details(similar_policies)
-            
-            # 4. AI分析匹配度
-            matches = await self._analyze_matches(company_profile, policy_details)
-            
-            # 5. 过滤和排序
-            filtered_matches = [m for m in matches if m.match_score >= min_score]
-            filtered_matches.sort(key=lambda x: x.match_score, reverse=True)
+            # 6. 过滤和排序
+            ranked_matches = self._rank_matches(
+                matches, self._candidate_positions(llm_policies, rule_matches), min_score, top_k
+            )
             
             processing_time = time.time() - start_time
-            logger.info(f"政策匹配完成，耗时: {processing_time:.2f}秒，返回{len(filtered_matches[:top_k])}个结果")
+            logger.info(
+                f"政策匹配完成，耗时: {processing_time:.2f}秒，AI分析{len(llm_policies)}个政策，"
+                f"返回{len(ranked_matches)}个结果"
+            )
             
-            return filtered_matches[:top_k]
+            return ranked_matches
             
         except Exception as e:
             logger.error(f"政策匹配失败: {e}")
             raise
     
+    async def stream_matches(
+        self,
+        company_profile: CompanyProfile,
+        top_k: int = 5,
+        min_score: float = 0.3,
+        llm_budget: Optional[int] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        流式匹配政策，与 match_policies 的流程和最终结果相同，按阶段产出 (事件, 数据)：
+        
+        - preliminary：召回后立即产出的规则评分结果（List[PolicyMatch]，已排序）
+        - match：每个AI分析完成时产出更新后的结果（PolicyMatch）
+        - summary：全部分析完成后的最终排序结果（List[PolicyMatch]，最多 top_k 个）
+        
+        调用方提前停止迭代（如客户端断开）时，未完成的DeepSeek请求被取消。
+        """
+        llm_policies, rule_matches = await self._select_candidates(company_profile, top_k, min_score, llm_budget)
+        
+        results: Dict[str, PolicyMatch] = {match.policy_id: match for match in rule_matches}
+        for policy in llm_policies:
+            match = self._build_match(policy, self._fallback_analysis(company_profile, policy))
+            results[match.policy_id] = match
+        positions = self._candidate_positions(llm_policies, rule_matches)
+        yield "preliminary", self._rank_matches(results.values(), positions, min_score)
+        
+        analyses = self._iter_analyses(company_profile, llm_policies)
+        try:
+            async for i, analysis in analyses:
+                policy = llm_policies[i]
+                try:
+                    match = self._build_match(policy, analysis) if analysis else None
+                except Exception as e:
+                    logger.error(f"分析政策{policy.id}失败: {e}")
+                    match = None
+                if match is None:
+                    # 与 match_policies 一致：分析失败的政策不出现在最终结果中
+                    results.pop(str(policy.id), None)
+                    continue
+                results[match.policy_id] = match
+                yield "match", match
+        finally:
+            await analyses.aclose()
+        
+        yield "summary", self._rank_matches(results.values(), positions, min_score, top_k)
+    
+    async def _select_candidates(
+        self,
+        company_profile: CompanyProfile,
+        top_k: int,
+        min_score: float,
+        llm_budget: Optional[int]
+    ) -> Tuple[List[Policy], List[PolicyMatch]]:
+        """召回候选政策并做规则预评分，返回 (待AI分析的政策, 规则评分的匹配结果)"""
+        if llm_budget is None:
+            llm_budget = settings.MATCH_LLM_BUDGET
+        if not self.ready:
+            self.start_warm_up()
+        self._schedule_lexical_refresh()
+        
+        # 1. 生成企业画像描述
+        company_description = self._generate_company_description(company_profile)
+        
+        # 2. 向量搜索和关键词搜索相似政策，按倒数排名融合
+        vector_hits = await self._vector_search(company_description, top_k * 2) if self.ready else []
+        lexical_hits = self._lexical_search(company_profile, top_k * 2)
+        similar_policies = self._fuse_hits(vector_hits, lexical_hits, top_k * 2)
+        
+        if self.ready or similar_policies:
+            # 3. 获取政策详细信息
+            policy_details = await self._get_policy_details(similar_policies)
+        else:
+            # 预热未完成且关键词召回无结果：降级为规则评分
+            logger.warning(f"向量召回未就绪 {self.components}，使用规则评分")
+            policy_details = await self._get_recent_policies(settings.MATCH_DEGRADED_CANDIDATES)
+            llm_budget = 0
+        
+        # 4. 规则预评分，选出进行AI分析的候选
+        return self._cascade(company_profile, policy_details, min_score, llm_budget)
+    
+    def _candidate_positions(
+        self,
+        llm_policies: List[Policy],
+        rule_matches: List[PolicyMatch]
+    ) -> Dict[str, int]:
+        """候选顺序：先AI分析的政策，再规则评分的政策（均为规则预评分顺序）"""
+        policy_ids = [str(policy.id) for policy in llm_policies] + [match.policy_id for match in rule_matches]
+        return {policy_id: position for position, policy_id in enumerate(policy_ids)}
+    
+    def _rank_matches(
+        self,
+        matches: Iterable[PolicyMatch],
+        positions: Dict[str, int],
+        min_score: float,
+        top_k: Optional[int] = None
+    ) -> List[PolicyMatch]:
+        """
+        过滤低于 min_score 的结果后排序：AI分析的结果在前，规则评分的结果在后
+        （两种分数不在同一尺度上，规则分不与AI分混排），各层内按分数从高到低，同分时按候选顺序
+        """
+        filtered_matches = [m for m in matches if m.match_score >= min_score]
+        filtered_matches.sort(key=lambda x: (
+            x.score_source != ScoreSource.LLM, -x.match_score, positions[x.policy_id]
+        ))
+        return filtered_matches[:top_k]
+    
+    def _lexical_query(self, profile: CompanyProfile) -> str:
+        """由企业画像生成关键词查询：产业关键词、企业认定术语和注册地"""
+        terms = list(INDUSTRY_KEYWORDS.get(profile.industry_match, []))
+        if profile.enterprise_certification:
+            terms.extend(CERTIFICATION_TERMS.get(profile.enterprise_certification, []))
+        if profile.registration_location == "xuhui":
+            terms.append("徐汇")
+        return " ".join(terms)
+    
+    def _lexical_search(self, profile: CompanyProfile, top_k: int) -> List[Dict]:
+        """关键词搜索"""
+        if not settings.LEXICAL_INDEX_ENABLED:
+            return []
+        query = self._lexical_query(profile)
+        return [
+            {'policy_id': policy_id, 'bm25': score}
+            for policy_id, score in self.lexical_index.search(query, top_k)
+        ]
+    
+    def _fuse_hits(self, vector_hits: List[Dict], lexical_hits: List[Dict], limit: int) -> List[Dict]:
+        """
+        倒数排名融合（RRF）
+        
+        每路结果按排名得分 1 / (HYBRID_RRF_K + 排名)，同一政策的得分相加后取前 limit 个；
+        similarity 保留向量相似度（只被关键词召回的为0）。
+        """
+        fused: Dict[str, Dict] = {}
+        for hits in (vector_hits, lexical_hits):
+            for rank, hit in enumerate(hits, start=1):
+                entry = fused.setdefault(hit['policy_id'], {
+                    'policy_id': hit['policy_id'],
+                    'similarity': 0.0,
+                    'metadata': {},
+                    'rrf_score': 0.0
+                })
+                entry['rrf_score'] += 1.0 / (settings.HYBRID_RRF_K + rank)
+                if 'similarity' in hit:
+                    entry['similarity'] = hit['similarity']
+                    entry['metadata'] = hit.get('metadata') or {}
+        return sorted(fused.values(), key=lambda entry: entry['rrf_score'], reverse=True)[:limit]
+    
+    async def _get_recent_policies(self, limit: int) -> List[Policy]:
+        """最近更新的有效政策（向量召回不可用时的候选）"""
+        async with AsyncSessionLocal() as session:
+            stmt = (
+                select(Policy)
+                .where(Policy.is_active == True)
+                .order_by(Policy.updated_at.desc())
+                .limit(limit)
+            )
+            result = await session.execute(stmt)
+            policies = result.scalars().all()
+            for policy in policies:
+                policy.similarity = 0.0
+            return list(policies)
+    
+    def _cascade(
+        self,
+        company_profile: CompanyProfile,
+        policies: List[Policy],
+        min_score: float,
+        llm_budget: int
+    ) -> Tuple[List[Policy], List[PolicyMatch]]:
+        """
+        规则预评分
+        
+        预评分为规则分数去掉基础分数后的命中加分（0-0.5），加上 MATCH_PRESCORE_MARGIN
+        仍达不到 min_score 的候选直接淘汰；其余按规则分数（相同时按向量相似度）排序，
+        前 llm_budget 个进行AI分析，剩下的使用规则分数。返回 (AI分析的政策, 规则评分的匹配结果)。
+        """
+        candidates = []
+        for policy in policies:
+            analysis = self._fallback_analysis(company_profile, policy)
+            # 基础分数对所有政策相同，不能用来判断相关性
+            prescore = analysis["match_score"] - RULE_BASE_SCORE
+            if prescore + settings.MATCH_PRESCORE_MARGIN >= min_score:
+                candidates.append((analysis, policy))
+        candidates.sort(
+            key=lambda item: (item[0]["match_score"], getattr(item[1], "similarity", 0.0)),
+            reverse=True
+        )
+        
+        llm_policies = [policy for _, policy in candidates[:llm_budget]]
+        rule_matches = [self._build_match(policy, analysis) for analysis, policy in candidates[llm_budget:]]
+        return llm_policies, rule_matches
+    
     def _generate_company_description(self, profile: CompanyProfile) -> str:
         """生成企业画像描述"""
         description_parts = [
@@ -100,34 +489,17 @@ class PolicyMatcherService:
     async def _vector_search(self, query: str, top_k: int) -> List[Dict]:
         """向量搜索"""
         try:
-            if not self.embedding_model:
-                logger.warning("BGE模型未加载，使用基础搜索")
-                return []
+            # 生成查询向量（优先使用缓存）
+            query_vector = await self.embedding_cache.get(query)
+            if query_vector is None:
+                if not self.embedding_model:
+                    logger.warning("BGE模型未加载，使用基础搜索")
+                    return []
+                query_vector = await self.embedding_worker.encode(query)
+                await self.embedding_cache.set(query, query_vector)
             
-            # 生成查询向量
-            query_embedding = self.embedding_model.encode([query]).tolist()[0]
-            
-            # 在ChromaDB中搜索
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=top_k,
-                include=["metadatas", "distances"]
-            )
-            
-            # 转换结果格式
-            similar_policies = []
-            if results['ids'] and results['ids'][0]:
-                for i, policy_id in enumerate(results['ids'][0]):
-                    similarity = 1 - results['distances'][0][i]  # 转换为相似度
-                    metadata = results['metadatas'][0][i] if results['metadatas'] else {}
-                    
-                    similar_policies.append({
-                        'policy_id': policy_id,
-                        'similarity': similarity,
-                        'metadata': metadata
-                    })
-            
-            return similar_policies
+            # 在向量库中搜索（大矩阵计算在线程池中进行）
+            return await asyncio.to_thread(self.vector_store.query, query_vector, top_k)
             
         except Exception as e:
             logger.error(f"向量搜索失败: {e}")
@@ -140,7 +512,7 @@ class PolicyMatcherService:
         
         policy_ids = [p['policy_id'] for p in similar_policies]
         
-        async with AsyncSession(bind=get_db()) as session:
+        async with AsyncSessionLocal() as session:
             stmt = select(Policy).where(
                 Policy.id.in_(policy_ids),
                 Policy.is_active == True
@@ -160,98 +532,351 @@ class PolicyMatcherService:
         company_profile: CompanyProfile, 
         policies: List[Policy]
     ) -> List[PolicyMatch]:
-        """AI分析匹配度"""
-        matches = []
+        """AI分析匹配度，结果与 policies 顺序一致（分析失败的政策不返回）"""
+        analyses: List[Optional[Dict[str, Any]]] = [None] * len(policies)
+        async for i, analysis in self._iter_analyses(company_profile, policies):
+            analyses[i] = analysis
         
-        for policy in policies:
+        matches = []
+        for policy, analysis in zip(policies, analyses):
+            if not analysis:
+                continue
             try:
-                # 调用DeepSeek API分析匹配度
-                analysis = await self._call_deepseek_api(company_profile, policy)
-                
-                if analysis:
-                    match = PolicyMatch(
-                        policy_id=policy.id,
-                        policy_name=policy.policy_name,
-                        match_score=analysis.get('match_score', 0.0),
-                        support_type=policy.support_type,
-                        max_amount=policy.max_amount,
-                        deadline=policy.deadline,
-                        matched_requirements=analysis.get('matched_requirements', []),
-                        missing_requirements=analysis.get('missing_requirements', []),
-                        recommendation=analysis.get('recommendation', ''),
-                        source_url=policy.source_url
-                    )
-                    matches.append(match)
-                    
+                matches.append(self._build_match(policy, analysis))
             except Exception as e:
                 logger.error(f"分析政策{policy.id}失败: {e}")
                 continue
         
         return matches
     
+    async def _iter_analyses(
+        self,
+        company_profile: CompanyProfile,
+        policies: List[Policy]
+    ) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]]]]:
+        """
+        按完成顺序产出 (政策序号, 分析结果)，分析失败的政策产出 None
+        
+        已缓存的政策直接使用缓存结果；其余政策在启用批量分析时按token预算分组，
+        每组一次DeepSeek请求，否则每个政策一次请求。各组并发进行，同时在途的请求数
+        受 MATCH_ANALYSIS_CONCURRENCY 限制；超过 MATCH_ANALYSIS_DEADLINE 仍未完成的
+        分析被取消，改用规则分析结果。调用方提前停止迭代时，未完成的分析同样被取消。
+        """
+        uncached = []
+        for i, policy in enumerate(policies):
+            cache_key, policy_hash = self._analysis_cache_key(company_profile, policy)
+            analysis = await self.analysis_cache.get(cache_key, str(policy.id), policy_hash)
+            if analysis is None:
+                uncached.append(i)
+            else:
+                yield i, analysis
+        
+        if settings.MATCH_ANALYSIS_BATCH_ENABLED:
+            groups = self._plan_batches(company_profile, policies, uncached)
+        else:
+            groups = [[i] for i in uncached]
+        
+        tasks = {
+            asyncio.create_task(self._analyze_group(company_profile, [policies[i] for i in group])): group
+            for group in groups
+        }
+        pending = set(tasks)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.MATCH_ANALYSIS_DEADLINE
+        try:
+            while pending:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    group = tasks[task]
+                    try:
+                        group_analyses = task.result()
+                    except Exception as e:
+                        logger.error(f"分析政策{[policies[i].id for i in group]}失败: {e}")
+                        group_analyses = [None] * len(group)
+                    for i, analysis in zip(group, group_analyses):
+                        yield i, analysis
+            
+            if pending:
+                for task in pending:
+                    task.cancel()
+                logger.warning(
+                    f"{sum(len(tasks[task]) for task in pending)}个政策的AI分析超过"
+                    f"{settings.MATCH_ANALYSIS_DEADLINE}秒，使用规则分析结果"
+                )
+                for task in pending:
+                    for i in tasks[task]:
+                        yield i, self._fallback_analysis(company_profile, policies[i])
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _analyze_group(self, company_profile: CompanyProfile, policies: List[Policy]) -> List[Dict[str, Any]]:
+        """分析一组政策：单个政策单独请求，多个政策合并为一次批量请求"""
+        if len(policies) == 1:
+            return [await self._call_deepseek_api(company_profile, policies[0])]
+        
+        results = await self._call_deepseek_batch(company_profile, policies)
+        
+        # 批量回复中缺失或格式不合格的政策单独重试（失败时由 _call_deepseek_api 回退到规则分析）
+        missing = [i for i in range(len(policies)) if i not in results]
+        if missing:
+            logger.warning(f"批量分析缺少{len(missing)}个政策的结果，单独重试")
+            retried = await asyncio.gather(
+                *(self._call_deepseek_api(company_profile, policies[i]) for i in missing)
+            )
+            results.update(zip(missing, retried))
+        
+        return [results[i] for i in range(len(policies))]
+    
+    def _build_match(self, policy: Policy, analysis: Dict[str, Any]) -> PolicyMatch:
+        """由分析结果构建匹配结果"""
+        return PolicyMatch(
+            policy_id=policy.id,
+            policy_name=policy.policy_name,
+            match_score=analysis.get('match_score', 0.0),
+            support_type=policy.support_type,
+            max_amount=policy.max_amount,
+            deadline=policy.deadline,
+            matched_requirements=analysis.get('matched_requirements', []),
+            missing_requirements=analysis.get('missing_requirements', []),
+            recommendation=analysis.get('recommendation', ''),
+            source_url=policy.source_url,
+            score_source=analysis.get('score_source', ScoreSource.LLM)
+        )
+    
+    async def _post_completion(self, prompt: str, max_tokens: int) -> str:
+        """
+        发送分析请求，返回模型回复内容；HTTP状态异常时抛出 httpx.HTTPStatusError
+        
+        提示指纹（模型、提示内容和输出token上限）相同的并发请求只调用一次DeepSeek，共享回复；
+        同时在途的调用数受 MATCH_ANALYSIS_CONCURRENCY 限制，等待共享结果的请求不占用名额。
+        """
+        fingerprint = content_hash([settings.DEEPSEEK_MODEL, max_tokens, prompt])
+        return await self.analysis_flights.do(
+            fingerprint, lambda: self._request_completion(prompt, max_tokens)
+        )
+    
+    async def _request_completion(self, prompt: str, max_tokens: int) -> str:
+        """在并发上限内调用DeepSeek API"""
+        async with self.analysis_semaphore:
+            client = shared_http_client.client
+            response = await client.post(
+                f"{settings.DEEPSEEK_BASE_URL}/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {settings.DEEPSEEK_API_KEY}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": settings.DEEPSEEK_MODEL,
+                    "messages": [
+                        {
+                            "role": "system",
+                            "content": ANALYSIS_SYSTEM_PROMPT
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    "temperature": 0.3,
+                    "max_tokens": max_tokens
+                },
+                timeout=shared_http_client.timeout(
+                    settings.DEEPSEEK_ANALYSIS_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT
+                )
+            )
+            response.raise_for_status()
+            result = response.json()
+            return result['choices'][0]['message']['content']
+    
     async def _call_deepseek_api(
         self, 
         company_profile: CompanyProfile, 
         policy: Policy
     ) -> Dict[str, Any]:
-        """调用DeepSeek API分析"""
+        """调用DeepSeek API分析（相同的企业画像和政策内容直接返回缓存结果）"""
         try:
+            cache_key, policy_hash = self._analysis_cache_key(company_profile, policy)
+            cached = await self.analysis_cache.get(cache_key, str(policy.id), policy_hash)
+            if cached is not None:
+                return cached
+            
             # 构建分析提示
             prompt = self._build_analysis_prompt(company_profile, policy)
+            content = await self._post_completion(prompt, max_tokens=1000)
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{settings.DEEPSEEK_BASE_URL}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {settings.DEEPSEEK_API_KEY}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": settings.DEEPSEEK_MODEL,
-                        "messages": [
-                            {
-                                "role": "system",
-                                "content": "你是一个专业的政策分析师，擅长分析企业与政策的匹配度。请严格按照JSON格式返回分析结果。"
-                            },
-                            {
-                                "role": "user",
-                                "content": prompt
-                            }
-                        ],
-                        "temperature": 0.3,
-                        "max_tokens": 1000
-                    }
-                )
+            # 解析JSON响应
+            try:
+                analysis = json.loads(content)
+            except json.JSONDecodeError:
+                logger.error(f"DeepSeek返回非JSON格式: {content}")
+                return self._fallback_analysis(company_profile, policy)
+            if not isinstance(analysis, dict) or not self._is_valid_analysis(analysis):
+                # 格式不完整的回复不写入缓存，避免在整个有效期内重复返回
+                logger.error(f"DeepSeek返回的分析结果格式无效: {content}")
+                return self._fallback_analysis(company_profile, policy)
+            await self.analysis_cache.set(cache_key, str(policy.id), policy_hash, analysis)
+            return analysis
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    content = result['choices'][0]['message']['content']
-                    
-                    # 解析JSON响应
-                    try:
-                        analysis = json.loads(content)
-                        return analysis
-                    except json.JSONDecodeError:
-                        logger.error(f"DeepSeek返回非JSON格式: {content}")
-                        return self._fallback_analysis(company_profile, policy)
-                else:
-                    logger.error(f"DeepSeek API错误: {response.status_code}")
-                    return self._fallback_analysis(company_profile, policy)
-                    
+        except httpx.HTTPStatusError as e:
+            logger.error(f"DeepSeek API错误: {e.response.status_code}")
+            return self._fallback_analysis(company_profile, policy)
         except Exception as e:
             logger.error(f"调用DeepSeek API失败: {e}")
             return self._fallback_analysis(company_profile, policy)
     
-    def _build_analysis_prompt(self, company_profile: CompanyProfile, policy: Policy) -> str:
-        """构建分析提示"""
-        # 格式化发布时间
+    async def _call_deepseek_batch(
+        self,
+        company_profile: CompanyProfile,
+        policies: List[Policy]
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        一次请求分析多个政策
+        
+        返回 {组内序号: 分析结果}，只包含校验通过的结果；请求失败时返回空字典，
+        由调用方对缺失的政策单独重试。
+        """
+        try:
+            prompt = self._build_batch_prompt(company_profile, policies)
+            content = await self._post_completion(
+                prompt, max_tokens=settings.MATCH_ANALYSIS_OUTPUT_TOKENS * len(policies)
+            )
+        except httpx.HTTPStatusError as e:
+            logger.error(f"DeepSeek批量分析API错误: {e.response.status_code}")
+            return {}
+        except Exception as e:
+            logger.error(f"调用DeepSeek批量分析失败: {e}")
+            return {}
+        
+        results = {}
+        for item in self._parse_batch_reply(content):
+            index = item.get("policy_index")
+            if not isinstance(index, int) or not 1 <= index <= len(policies) or index - 1 in results:
+                continue
+            analysis = {name: item[name] for name in item if name != "policy_index"}
+            if not self._is_valid_analysis(analysis):
+                continue
+            results[index - 1] = analysis
+        
+        for index, analysis in results.items():
+            cache_key, policy_hash = self._analysis_cache_key(company_profile, policies[index])
+            await self.analysis_cache.set(cache_key, str(policies[index].id), policy_hash, analysis)
+        return results
+    
+    def _parse_batch_reply(self, content: str) -> List[Dict[str, Any]]:
+        """解析批量分析回复（JSON数组，允许包在代码块或 {"results": [...]} 中）"""
+        text = content.strip()
+        if text.startswith("```"):
+            text = text.strip("`")
+            text = text[text.find("\n") + 1:] if "\n" in text else text
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            logger.error(f"DeepSeek批量分析返回非JSON格式: {content[:200]}")
+            return []
+        if isinstance(data, dict):
+            data = data.get("results", [])
+        if not isinstance(data, list):
+            return []
+        return [item for item in data if isinstance(item, dict)]
+    
+    def _is_valid_analysis(self, analysis: Dict[str, Any]) -> bool:
+        """校验单个政策的分析结果格式"""
+        score = analysis.get("match_score")
+        if isinstance(score, bool) or not isinstance(score, (int, float)) or not 0 <= score <= 1:
+            return False
+        for name in ("matched_requirements", "missing_requirements"):
+            values = analysis.get(name, [])
+            if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+                return False
+        return isinstance(analysis.get("recommendation", ""), str)
+    
+    def _plan_batches(
+        self,
+        company_profile: CompanyProfile,
+        policies: List[Policy],
+        positions: List[int]
+    ) -> List[List[int]]:
+        """
+        按token预算和分析时限把待分析的政策分组
+        
+        每组的提示token（公共部分 + 各政策信息）加上预留的输出token不超过
+        MATCH_ANALYSIS_BATCH_TOKEN_BUDGET，且每组最多 MATCH_ANALYSIS_BATCH_MAX_POLICIES 个政策。
+        一组的输出是一次顺序生成，组大小还受时限限制：按 MATCH_ANALYSIS_OUTPUT_TOKENS_PER_SECOND
+        估算，每组的预留输出须在 MATCH_ANALYSIS_DEADLINE 内生成完；并且政策均匀分散到
+        MATCH_ANALYSIS_CONCURRENCY 个并发请求中，不会在有空闲并发名额时排成一个长请求。
+        """
+        base_tokens = estimate_tokens(ANALYSIS_SYSTEM_PROMPT + self._build_batch_prompt(company_profile, []))
+        deadline_limit = int(
+            settings.MATCH_ANALYSIS_DEADLINE * settings.MATCH_ANALYSIS_OUTPUT_TOKENS_PER_SECOND
+            / settings.MATCH_ANALYSIS_OUTPUT_TOKENS
+        )
+        concurrency_limit = -(-len(positions) // max(settings.MATCH_ANALYSIS_CONCURRENCY, 1))
+        max_policies = max(1, min(settings.MATCH_ANALYSIS_BATCH_MAX_POLICIES, deadline_limit, concurrency_limit))
+        groups: List[List[int]] = []
+        group: List[int] = []
+        group_tokens = base_tokens
+        for position in positions:
+            policy_tokens = (
+                estimate_tokens(self._build_policy_block(policies[position], len(group) + 1))
+                + settings.MATCH_ANALYSIS_OUTPUT_TOKENS
+            )
+            if group and (
+                group_tokens + policy_tokens > settings.MATCH_ANALYSIS_BATCH_TOKEN_BUDGET
+                or len(group) >= max_policies
+            ):
+                groups.append(group)
+                group, group_tokens = [], base_tokens
+            group.append(position)
+            group_tokens += policy_tokens
+        if group:
+            groups.append(group)
+        return groups
+    
+    def _format_publish_date(self, policy: Policy) -> str:
+        """格式化发布时间"""
         publish_date = getattr(policy, 'publish_date', None) or getattr(policy, 'publish_time', None) or getattr(policy, 'created_at', None)
-        formatted_publish_date = str(publish_date) if publish_date else '未知时间'
+        return str(publish_date) if publish_date else '未知时间'
+    
+    def _analysis_cache_key(self, company_profile: CompanyProfile, policy: Policy) -> Tuple[str, str]:
+        """
+        分析缓存的键和政策内容哈希
         
-        return f"""
-请分析以下企业与政策的匹配度：
-
-**企业信息：**
+        键由分析提示中用到的政策字段、规范化的企业画像、模型名称和提示版本共同决定。
+        """
+        policy_hash = content_hash({
+            "policy_name": policy.policy_name,
+            "region": policy.region,
+            "industry_tags": policy.industry_tags,
+            "requirements": policy.requirements,
+            "support_type": policy.support_type,
+            "max_amount": policy.max_amount,
+            "publish_date": self._format_publish_date(policy)
+        })
+        profile = company_profile.dict(include={
+            "company_name", "registration_location", "industry_match", "company_scale",
+            "rd_investment", "patents", "enterprise_certification", "operating_status", "credit_status"
+        })
+        normalized_profile = {
+            name: (value.value if hasattr(value, "value") else value.strip() if isinstance(value, str) else value)
+            for name, value in profile.items()
+        }
+        normalized_profile["patents"] = normalized_profile["patents"] or 0
+        
+        cache_key = content_hash({
+            "prompt_version": ANALYSIS_PROMPT_VERSION,
+            "model": settings.DEEPSEEK_MODEL,
+            "policy_hash": policy_hash,
+            "profile": normalized_profile
+        })
+        return cache_key, policy_hash
+    
+    def _build_company_block(self, company_profile: CompanyProfile) -> str:
+        """分析提示中的企业信息部分"""
+        return f"""**企业信息：**
 - 企业名称：{company_profile.company_name}
 - 注册地：{company_profile.registration_location}
 - 产业类型：{company_profile.industry_match}
@@ -260,16 +885,28 @@ class PolicyMatcherService:
 - 专利数量：{company_profile.patents}
 - 企业认定：{company_profile.enterprise_certification or '无'}
 - 经营状态：{company_profile.operating_status}
-- 信用状态：{company_profile.credit_status}
-
-**政策信息：**
+- 信用状态：{company_profile.credit_status}"""
+    
+    def _build_policy_block(self, policy: Policy, index: Optional[int] = None) -> str:
+        """分析提示中的政策信息部分（批量分析时带序号）"""
+        title = f"**政策{index}信息：**" if index is not None else "**政策信息：**"
+        return f"""{title}
 - 政策名称：{policy.policy_name}
 - 适用地区：{policy.region}
 - 产业标签：{policy.industry_tags}
 - 申请要求：{policy.requirements}
 - 支持类型：{policy.support_type}
 - 最高金额：{policy.max_amount or '未限定'}
-- 发布时间：{formatted_publish_date}
+- 发布时间：{self._format_publish_date(policy)}"""
+    
+    def _build_analysis_prompt(self, company_profile: CompanyProfile, policy: Policy) -> str:
+        """构建分析提示"""
+        return f"""
+请分析以下企业与政策的匹配度：
+
+{self._build_company_block(company_profile)}
+
+{self._build_policy_block(policy)}
 
 请返回JSON格式的分析结果，包含以下字段：
 {{
@@ -283,12 +920,42 @@ class PolicyMatcherService:
 1. 根据企业的产业类型、规模、研发投入等与政策要求的匹配程度评分
 2. 详细列出企业满足和不满足的具体要求
 3. 提供实用的申请建议和改进建议
+"""
+    
+    def _build_batch_prompt(self, company_profile: CompanyProfile, policies: List[Policy]) -> str:
+        """构建批量分析提示：企业信息只出现一次，各政策按序号列出"""
+        policy_blocks = "\n\n".join(
+            self._build_policy_block(policy, index) for index, policy in enumerate(policies, start=1)
+        )
+        return f"""
+请分别分析以下企业与{len(policies)}项政策的匹配度：
+
+{self._build_company_block(company_profile)}
+
+{policy_blocks}
+
+请返回JSON数组，每项政策一个元素，按政策序号排列，每个元素包含以下字段：
+[
+    {{
+        "policy_index": 1,  // 政策序号
+        "match_score": 0.85,  // 匹配分数，0-1之间的浮点数
+        "matched_requirements": ["满足的要求1", "满足的要求2"],  // 企业满足的政策要求
+        "missing_requirements": ["不满足的要求1"],  // 企业不满足的政策要求
+        "recommendation": "具体的申请建议和改进方向"  // AI推荐建议
+    }}
+]
+
+分析要点：
+1. 根据企业的产业类型、规模、研发投入等与政策要求的匹配程度评分
+2. 详细列出企业满足和不满足的具体要求
+3. 提供实用的申请建议和改进建议
+4. 只返回JSON数组，不要包含其他内容
 """
     
     def _fallback_analysis(self, company_profile: CompanyProfile, policy: Policy) -> Dict[str, Any]:
-        """备用分析方法"""
+        """备用分析方法（同时用作匹配前的规则预评分）"""
         # 基础匹配逻辑
-        score = 0.5  # 基础分数
+        score = RULE_BASE_SCORE  # 基础分数
         matched_reqs = []
         missing_reqs = []
         
@@ -298,14 +965,7 @@ class PolicyMatcherService:
             matched_reqs.append("注册地符合要求")
         
         # 产业匹配
-        industry_keywords = {
-            "ai-tech": ["AI", "人工智能", "科技", "技术"],
-            "manufacturing": ["制造", "生产", "工业"],
-            "service": ["服务", "商业"],
-            "other": []
-        }
-        
-        keywords = industry_keywords.get(company_profile.industry_match, [])
+        keywords = INDUSTRY_KEYWORDS.get(company_profile.industry_match, [])
         if any(keyword in str(policy.industry_tags) for keyword in keywords):
             score += 0.2
             matched_reqs.append("产业类型匹配")
@@ -321,7 +981,8 @@ class PolicyMatcherService:
             "match_score": min(score, 1.0),
             "matched_requirements": matched_reqs,
             "missing_requirements": missing_reqs,
-            "recommendation": f"建议详细了解{policy.policy_name}的具体申请条件，并准备相关材料。"
+            "recommendation": f"建议详细了解{policy.policy_name}的具体申请条件，并准备相关材料。",
+            "score_source": ScoreSource.RULE
         }
 
 # 创建全局服务实例
@@ -0,0 +1,102 @@
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+# 取值集合很小、在政策间大量重复的字符串字段
+SYMBOL_FIELDS = frozenset({
+    "region", "support_type", "deadline", "application_period", "approval_department", "last_updated",
+})
+
+# 标签、要求类列表字段，转换为共享的元组
+TUPLE_FIELDS = frozenset({
+    "industry_tags", "requirements", "target_industries", "target_scale", "target_rd",
+})
+
+
+class SymbolTable:
+    """
+    符号表
+
+    把重复出现的字符串、字符串元组和字段布局驻留为同一个对象，
+    相同的标签、枚举值和列表在所有政策之间只保存一份。
+    """
+
+    def __init__(self):
+        self._tuples: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        self._layouts: Dict[Tuple[str, ...], "PolicyLayout"] = {}
+
+    def symbol(self, value: Any) -> Any:
+        return sys.intern(value) if isinstance(value, str) else value
+
+    def symbols(self, values: Iterable[Any]) -> Tuple[Any, ...]:
+        values = tuple(self.symbol(value) for value in values)
+        return self._tuples.setdefault(values, values)
+
+    def layout(self, keys: Tuple[str, ...]) -> "PolicyLayout":
+        layout = self._layouts.get(keys)
+        if layout is None:
+            layout = self._layouts[keys] = PolicyLayout(tuple(sys.intern(key) for key in keys))
+        return layout
+
+
+class PolicyLayout:
+    """字段布局：字段名及其在取值元组中的位置，所有字段相同的政策共享一份"""
+
+    __slots__ = ("keys", "positions")
+
+    def __init__(self, keys: Tuple[str, ...]):
+        self.keys = keys
+        self.positions = {key: i for i, key in enumerate(keys)}
+
+
+class CompiledPolicy(Mapping):
+    """
+    紧凑的只读政策记录
+
+    取值按字段布局存放在一个元组中，字符串和列表经符号表驻留共享。
+    按字典方式读取（policy["region"]、policy.get(...)），字段顺序与原始字典一致；
+    正文等长文本不放在记录中，由快照单独保存。
+    """
+
+    __slots__ = ("_layout", "_values")
+
+    def __init__(self, layout: PolicyLayout, values: Tuple[Any, ...]):
+        self._layout = layout
+        self._values = values
+
+    def __getitem__(self, key: str) -> Any:
+        return self._values[self._layout.positions[key]]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._layout.positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._layout.keys)
+
+    def __len__(self) -> int:
+        return len(self._layout.keys)
+
+    def __repr__(self) -> str:
+        return f"CompiledPolicy({dict(self)!r})"
+
+
+def compact_policy(policy: Mapping, symbols: SymbolTable, exclude: Sequence[str] = ()) -> CompiledPolicy:
+    """把政策字典转换为紧凑记录（exclude 中的字段不保留）"""
+    keys = []
+    values = []
+    for key, value in policy.items():
+        if key in exclude:
+            continue
+        if key in TUPLE_FIELDS and isinstance(value, (list, tuple)):
+            value = symbols.symbols(value)
+        elif key in SYMBOL_FIELDS:
+            value = symbols.symbol(value)
+        keys.append(key)
+        values.append(value)
+    return CompiledPolicy(symbols.layout(tuple(keys)), tuple(values))
+
+
+def compact_policies(policies: Iterable[Mapping], exclude: Sequence[str] = ()) -> List[CompiledPolicy]:
+    """批量转换政策，共用一个符号表"""
+    symbols = SymbolTable()
+    return [compact_policy(policy, symbols, exclude) for policy in policies]
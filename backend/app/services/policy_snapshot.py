@@ -0,0 +1,178 @@
+import asyncio
+import itertools
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from .json_codec import dumps_members
+from .policy_record import compact_policies
+from .policy_stats import PolicyStats
+from .rule_engine import CompiledPolicies, MatchTable, compile_policies
+from .snapshot_store import SnapshotFile, write_snapshot_file
+
+logger = logging.getLogger(__name__)
+
+# 匹配结果中直接取自政策的字段（与 PolicyMatch 的字段顺序一致）
+POLICY_MATCH_FIELDS = (
+    "policy_id", "policy_name", "region", "support_type", "max_amount",
+    "deadline", "industry_tags", "source_url", "requirements",
+)
+
+
+class PolicySnapshot:
+    """
+    不可变的政策快照
+
+    一份快照包含政策列表及由它派生的列式编译结果、倒排索引和统计信息，
+    构建完成后不再修改（预计算匹配表除外，它在后台构建完成后一次性挂载）。
+    请求开始时取一次当前快照并在整个请求期间使用它，刷新数据只会发布新快照，
+    不会影响正在处理的请求。政策正文（content）与列表字段分开保存，
+    只在详情接口需要时读取。
+
+    每条政策的JSON编码结果在首次使用时缓存在快照上，后续请求直接拼接字节。
+    """
+
+    def __init__(self, version: int, policies: Sequence[dict]):
+        policies = list(policies)
+        self.version = version
+        # 列表字段转换为紧凑记录（CompiledPolicy），正文单独保存
+        self.policies: Sequence[Mapping] = tuple(compact_policies(policies, exclude=("content",)))
+        self.contents: Sequence[str] = [policy.get("content", "") for policy in policies]
+        self.policy_ids: Sequence[str] = [policy["policy_id"] for policy in self.policies]
+        self.compiled: CompiledPolicies = compile_policies(self.policies)
+        self.stats = PolicyStats(self.policies)
+        self.created_at = datetime.now()
+        self.match_table: Optional[MatchTable] = None
+        self._init_caches()
+
+    @classmethod
+    def from_parts(
+        cls,
+        version: int,
+        policies: Sequence[Mapping],
+        contents: Sequence[str],
+        policy_ids: Sequence[str],
+        compiled: CompiledPolicies
+    ) -> "PolicySnapshot":
+        """由已准备好的各部分（如内存映射的二进制快照）组装，统计信息直接由编译列计算"""
+        snapshot = cls.__new__(cls)
+        snapshot.version = version
+        snapshot.policies = policies
+        snapshot.contents = contents
+        snapshot.policy_ids = policy_ids
+        snapshot.compiled = compiled
+        snapshot.stats = _stats_from_compiled(compiled)
+        snapshot.created_at = datetime.now()
+        snapshot.match_table = None
+        snapshot._init_caches()
+        return snapshot
+
+    def _init_caches(self):
+        self._positions: Optional[Dict[str, int]] = None
+        self._policy_members: List[Optional[bytes]] = [None] * len(self.policies)
+        self._match_members: List[Optional[bytes]] = [None] * len(self.policies)
+
+    def __len__(self) -> int:
+        return len(self.policies)
+
+    def position_of(self, policy_id: str) -> Optional[int]:
+        """政策ID对应的位置（首次调用时建立映射）"""
+        if self._positions is None:
+            self._positions = {pid: index for index, pid in enumerate(self.policy_ids)}
+        return self._positions.get(policy_id)
+
+    def content(self, index: int) -> str:
+        """读取政策正文"""
+        return self.contents[index]
+
+    def policy_members(self, index: int) -> bytes:
+        """政策列表记录的JSON成员片段（不含花括号）"""
+        members = self._policy_members[index]
+        if members is None:
+            members = self._policy_members[index] = dumps_members(self.policies[index])
+        return members
+
+    def match_members(self, index: int) -> bytes:
+        """匹配结果中政策字段部分的JSON成员片段（不含花括号）"""
+        members = self._match_members[index]
+        if members is None:
+            policy = self.policies[index]
+            members = self._match_members[index] = dumps_members(
+                {field: policy[field] for field in POLICY_MATCH_FIELDS}
+            )
+        return members
+
+
+def _stats_from_compiled(compiled: CompiledPolicies) -> PolicyStats:
+    """由编译列统计地区、类型分布和截止日期"""
+    region_counts = np.bincount(compiled.region_codes, minlength=len(compiled.regions.codes))
+    type_counts = np.bincount(compiled.support_codes, minlength=len(compiled.support_types.codes))
+    deadline_days = compiled.deadline_days[compiled.deadline_days > 0]
+    return PolicyStats.from_counts(
+        total=compiled.size,
+        by_region={region: int(region_counts[code]) for region, code in compiled.regions.codes.items()},
+        by_type={support_type: int(type_counts[code]) for support_type, code in compiled.support_types.codes.items()},
+        deadline_days=np.sort(deadline_days).tolist()
+    )
+
+
+_version_counter = itertools.count(1)
+_publish_lock = threading.Lock()
+_current_snapshot = PolicySnapshot(0, [])
+
+
+def build_snapshot(policies: Sequence[dict]) -> PolicySnapshot:
+    """构建新快照（按 policy_id 去重，保留首次出现的政策）"""
+    seen = set()
+    unique_policies = []
+    for policy in policies:
+        if policy["policy_id"] in seen:
+            continue
+        seen.add(policy["policy_id"])
+        unique_policies.append(policy)
+
+    snapshot = PolicySnapshot(next(_version_counter), unique_policies)
+    logger.info(f"政策快照 v{snapshot.version} 构建完成，共 {len(snapshot)} 条政策")
+    return snapshot
+
+
+def save_snapshot(snapshot: PolicySnapshot, path: str, source_hash: str = ""):
+    """把快照写为二进制文件，供下次启动时直接映射；source_hash 记录源数据内容哈希"""
+    write_snapshot_file(
+        path, snapshot.policies, snapshot.contents, snapshot.policy_ids, snapshot.compiled, source_hash
+    )
+
+
+def open_snapshot(path: str) -> PolicySnapshot:
+    """内存映射二进制快照文件，作为一个新版本的快照"""
+    mapped = SnapshotFile(path)
+    snapshot = PolicySnapshot.from_parts(
+        next(_version_counter), mapped.policies, mapped.contents, mapped.policy_ids, mapped.compiled
+    )
+    logger.info(f"政策快照 v{snapshot.version} 已从二进制文件映射，共 {len(snapshot)} 条政策")
+    return snapshot
+
+
+def current_snapshot() -> PolicySnapshot:
+    """当前发布的政策快照"""
+    return _current_snapshot
+
+
+def publish_snapshot(snapshot: PolicySnapshot) -> bool:
+    """发布快照（单次引用替换）；版本不高于当前快照时放弃发布"""
+    global _current_snapshot
+    with _publish_lock:
+        if snapshot.version <= _current_snapshot.version:
+            return False
+        _current_snapshot = snapshot
+    return True
+
+
+async def load_snapshot(loader: Callable[[], List[dict]]) -> PolicySnapshot:
+    """在线程池中读取政策并构建快照，构建完成后发布"""
+    snapshot = await asyncio.to_thread(lambda: build_snapshot(loader()))
+    publish_snapshot(snapshot)
+    return current_snapshot()
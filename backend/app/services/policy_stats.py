@@ -0,0 +1,67 @@
+from bisect import bisect_right
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, List, Mapping, Optional, Sequence
+
+
+def deadline_ordinal(deadline) -> int:
+    """把 YYYY-MM-DD 格式的截止日期转换为日期序号，缺失或格式错误时返回 0"""
+    try:
+        return datetime.strptime(deadline, "%Y-%m-%d").toordinal()
+    except (TypeError, ValueError):
+        return 0
+
+
+class PolicyStats:
+    """
+    政策统计信息
+
+    每次加载政策数据时计算一次：按地区、支持类型、更新日期的计数器，
+    以及升序排列的截止日期序号数组。查询有效政策数只需对当天日期做一次二分查找。
+    """
+
+    def __init__(self, policies: Iterable[dict] = ()):
+        self.total = 0
+        self.by_region: Counter = Counter()
+        self.by_type: Counter = Counter()
+        self.updated_by_day: Counter = Counter()
+        self.updated_by_month: Counter = Counter()
+        deadline_days: List[int] = []
+
+        for policy in policies:
+            self.total += 1
+            self.by_region[policy["region"]] += 1
+            self.by_type[policy["support_type"]] += 1
+
+            last_updated = policy.get("last_updated", "")
+            self.updated_by_day[last_updated[:10]] += 1
+            self.updated_by_month[last_updated[:7]] += 1
+
+            # 截止日期缺失或格式错误的政策不计入有效政策
+            day = deadline_ordinal(policy.get("deadline"))
+            if day:
+                deadline_days.append(day)
+
+        deadline_days.sort()
+        self.deadline_days: Sequence[int] = deadline_days
+
+    @classmethod
+    def from_counts(
+        cls,
+        total: int,
+        by_region: Mapping[str, int],
+        by_type: Mapping[str, int],
+        deadline_days: Sequence[int]
+    ) -> "PolicyStats":
+        """由预先统计好的计数和已排序的截止日期序号构建"""
+        stats = cls()
+        stats.total = total
+        stats.by_region.update(by_region)
+        stats.by_type.update(by_type)
+        stats.deadline_days = deadline_days
+        return stats
+
+    def active_count(self, now: Optional[datetime] = None) -> int:
+        """截止日期晚于当前时间的政策数量"""
+        today = (now or datetime.now()).toordinal()
+        return len(self.deadline_days) - bisect_right(self.deadline_days, today)
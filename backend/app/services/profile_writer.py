@@ -0,0 +1,139 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import IO, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 队列中表示“停止写入”的哨兵
+_STOP = object()
+
+
+class ProfileWriter:
+    """
+    企业画像异步批量写入器
+
+    请求只把记录放入内存队列，由后台任务按条数或时间阈值成批写入 JSONL 文件
+    （文件 IO 在线程池中执行，不阻塞事件循环）。队列满时 submit 会等待，
+    对请求形成背压而不是无限占用内存；按配置间隔 fsync，文件超过大小上限时
+    按时间戳轮转。stop 会先写完队列中的全部记录再关闭文件。
+    """
+
+    def __init__(
+        self,
+        path: str = "data/companies.jsonl",
+        max_queue_size: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        fsync_interval: float = 5.0,
+        max_file_bytes: int = 50 * 1024 * 1024
+    ):
+        self.path = path
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.max_file_bytes = max_file_bytes
+
+        self.queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._file: Optional[IO[str]] = None
+        self._last_fsync = 0.0
+        self.written = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """启动后台写入任务"""
+        if self.running:
+            return
+        self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"企业信息写入器已启动: {self.path}")
+
+    async def submit(self, record: dict):
+        """提交一条记录；队列已满时等待（背压）"""
+        if not self.running:
+            # 写入器未启动（如脚本直接调用）时直接写入
+            await asyncio.to_thread(self._write_batch, [record])
+            return
+        await self.queue.put(record)
+
+    async def stop(self):
+        """写完队列中的全部记录后停止"""
+        if not self.running:
+            return
+        await self.queue.put(_STOP)
+        await self._task
+        self._task = None
+        logger.info(f"企业信息写入器已停止，共写入 {self.written} 条记录")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            if item is _STOP:
+                break
+
+            # 凑批：达到条数上限或等待超过 flush_interval 即写入
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except Exception as e:
+                logger.error(f"写入企业信息失败: {e}")
+
+        await asyncio.to_thread(self._close)
+
+    def _open(self) -> IO[str]:
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+
+    def _write_batch(self, batch: List[dict]):
+        f = self._open()
+        f.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in batch))
+        f.flush()
+        self.written += len(batch)
+
+        now = time.monotonic()
+        if now - self._last_fsync >= self.fsync_interval:
+            os.fsync(f.fileno())
+            self._last_fsync = now
+
+        if f.tell() >= self.max_file_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        """关闭当前文件并按时间戳重命名，下次写入时创建新文件"""
+        self._close()
+        rotated_path = f"{self.path}.{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+        os.replace(self.path, rotated_path)
+        logger.info(f"企业信息文件已轮转: {rotated_path}")
+
+    def _close(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
@@ -0,0 +1,439 @@
+import logging
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .policy_stats import deadline_ordinal
+
+logger = logging.getLogger(__name__)
+
+# 规则引擎加减分权重（与 main.calculate_policy_match 保持一致）
+INDUSTRY_HIT_BONUS = 0.15
+INDUSTRY_MISS_PENALTY = -0.05
+SCALE_HIT_BONUS = 0.10
+RD_HIT_BONUS = 0.12
+RD_MISS_PENALTY = -0.08
+LOAN_CREDIT_PENALTY = 0.15
+
+CERTIFICATION_BONUS = {
+    "high_tech": 0.20,
+    "specialized": 0.15,
+    "sme": 0.10,
+    "startup": 0.08,
+}
+
+XUHUI_REGION = "徐汇区"
+
+# uint64 位掩码最多容纳的取值个数
+MAX_VOCAB_SIZE = 64
+
+# base_score 分档位图的步长
+BASE_TIER_STEP = 0.05
+
+# 预计算匹配表中代表“词表外取值”的占位值
+_UNKNOWN_VALUE = "\x00unknown"
+
+# 预计算匹配表的离散维度：认定类型按加分档位归类，专利数量按 0 / 1-4 / >=5 分桶
+CERTIFICATION_CLASSES = [None] + list(CERTIFICATION_BONUS)
+PATENT_BUCKETS = [0, 1, 5]
+
+
+class Vocabulary:
+    """取值 -> 位序号 的符号表"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.codes: Dict[str, int] = {}
+
+    def add(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.codes)
+            if code >= MAX_VOCAB_SIZE:
+                raise ValueError(f"{self.name} 取值超过 {MAX_VOCAB_SIZE} 个，无法编码为位掩码")
+            self.codes[value] = code
+        return code
+
+    def mask_of(self, values: Sequence[str]) -> int:
+        mask = 0
+        for value in values:
+            mask |= 1 << self.add(value)
+        return mask
+
+    @classmethod
+    def from_values(cls, name: str, values: Sequence[str]) -> "Vocabulary":
+        vocab = cls(name)
+        for value in values:
+            vocab.add(value)
+        return vocab
+
+    def bit(self, value: str) -> np.uint64:
+        """单个取值对应的位，未出现过的取值返回 0（不命中任何政策）"""
+        code = self.codes.get(value)
+        return np.uint64(0) if code is None else np.uint64(1 << code)
+
+
+def _profile_terms(company) -> Tuple[float, float, float, float]:
+    """专利、认定、信用、经营四项加减分（顺序与 calculate_policy_match 一致）"""
+    if company.patents >= 5:
+        patent_bonus = 0.15
+    elif company.patents >= 1:
+        patent_bonus = 0.08
+    else:
+        patent_bonus = -0.05
+
+    certification_bonus = 0
+    if company.enterprise_certification:
+        certification_bonus = CERTIFICATION_BONUS.get(company.enterprise_certification, 0)
+
+    credit_bonus = 0.05 if company.credit_status == "good" else -0.10
+    operating_bonus = 0.05 if company.operating_status == "good" else -0.10
+
+    return patent_bonus, certification_bonus, credit_bonus, operating_bonus
+
+
+class CompiledPolicies:
+    """
+    政策列表的列式编译结果
+
+    加载时把每条政策编译为 NumPy 列：地区编码、行业/规模/研发位掩码、
+    支持类型编码和 base_score 向量，使一个企业画像对全部政策的打分
+    只需几次数组运算。
+    """
+
+    # 词表名称（与 Vocabulary.name 对应）及列名，供二进制快照读写
+    VOCABULARY_NAMES = ("region", "support_type", "target_industries", "target_scale", "target_rd")
+    COLUMN_NAMES = (
+        "region_codes", "support_codes", "industry_masks", "scale_masks",
+        "rd_masks", "base_scores", "deadline_days",
+    )
+
+    def __init__(self, policies: Sequence[dict]):
+        self.size = len(policies)
+
+        self.regions = Vocabulary("region")
+        self.support_types = Vocabulary("support_type")
+        self.industries = Vocabulary("target_industries")
+        self.scales = Vocabulary("target_scale")
+        self.rd_levels = Vocabulary("target_rd")
+
+        region_codes = np.empty(self.size, dtype=np.int32)
+        support_codes = np.empty(self.size, dtype=np.int32)
+        industry_masks = np.empty(self.size, dtype=np.uint64)
+        scale_masks = np.empty(self.size, dtype=np.uint64)
+        rd_masks = np.empty(self.size, dtype=np.uint64)
+        base_scores = np.empty(self.size, dtype=np.float64)
+        deadline_days = np.empty(self.size, dtype=np.int32)
+
+        for i, policy in enumerate(policies):
+            region_codes[i] = self.regions.add(policy["region"])
+            support_codes[i] = self.support_types.add(policy["support_type"])
+            industry_masks[i] = self.industries.mask_of(policy["target_industries"])
+            scale_masks[i] = self.scales.mask_of(policy["target_scale"])
+            rd_masks[i] = self.rd_levels.mask_of(policy["target_rd"])
+            base_scores[i] = policy["base_score"]
+            deadline_days[i] = deadline_ordinal(policy.get("deadline"))
+
+        self.region_codes = region_codes
+        self.support_codes = support_codes
+        self.industry_masks = industry_masks
+        self.scale_masks = scale_masks
+        self.rd_masks = rd_masks
+        self.base_scores = base_scores
+        # 截止日期的日期序号，0 表示缺失或格式错误
+        self.deadline_days = deadline_days
+
+        self._derive()
+
+    @classmethod
+    def from_columns(cls, vocabularies: Dict[str, List[str]], columns: Dict[str, np.ndarray]) -> "CompiledPolicies":
+        """由已编译好的词表和列（如内存映射的二进制快照）直接构建，不再逐条解析政策"""
+        compiled = cls.__new__(cls)
+        compiled.size = len(columns["base_scores"])
+        compiled.regions, compiled.support_types, compiled.industries, compiled.scales, compiled.rd_levels = (
+            Vocabulary.from_values(name, vocabularies[name]) for name in cls.VOCABULARY_NAMES
+        )
+        for name in cls.COLUMN_NAMES:
+            setattr(compiled, name, columns[name])
+        compiled._derive()
+        return compiled
+
+    def vocabularies(self) -> Dict[str, List[str]]:
+        """各词表的取值列表（按位序号排列）"""
+        return {
+            vocab.name: list(vocab.codes)
+            for vocab in (self.regions, self.support_types, self.industries, self.scales, self.rd_levels)
+        }
+
+    def _derive(self):
+        """由基础列计算派生列和倒排索引"""
+        # 徐汇区政策只对徐汇区注册企业开放
+        xuhui_code = self.regions.codes.get(XUHUI_REGION, -1)
+        self.xuhui_only = self.region_codes == xuhui_code
+        loan_code = self.support_types.codes.get("loan", -1)
+        self.is_loan = self.support_codes == loan_code
+
+        self.index = PolicyIndex(self)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def score(self, company, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        对政策打分
+
+        positions 为空时对全部政策打分，否则只计算给定位置的政策。返回裁剪到
+        [0, 1] 的匹配分数（不含地区排除，地区由 PolicyIndex 负责）。加分顺序与
+        calculate_policy_match 完全一致，保证浮点结果逐位相同。
+        """
+        if positions is None:
+            positions = slice(None)
+
+        scores = self.target_scores(company, positions)
+        for term in _profile_terms(company):
+            scores += term
+
+        if company.credit_status != "good":
+            scores -= np.where(self.is_loan[positions], LOAN_CREDIT_PENALTY, 0.0)
+
+        np.clip(scores, 0.0, 1.0, out=scores)
+        return scores
+
+    def target_scores(self, company, positions=slice(None)) -> np.ndarray:
+        """base_score 加上行业、规模、研发命中加减分（score 的前半部分，未裁剪）"""
+        industry_hit = (self.industry_masks[positions] & self.industries.bit(company.industry_match)) != 0
+        scale_hit = (self.scale_masks[positions] & self.scales.bit(company.company_scale)) != 0
+        rd_hit = (self.rd_masks[positions] & self.rd_levels.bit(company.rd_investment)) != 0
+
+        scores = self.base_scores[positions].copy()
+        scores += np.where(industry_hit, INDUSTRY_HIT_BONUS, INDUSTRY_MISS_PENALTY)
+        scores += np.where(scale_hit, SCALE_HIT_BONUS, 0.0)
+        scores += np.where(rd_hit, RD_HIT_BONUS, RD_MISS_PENALTY)
+        return scores
+
+    def match(self, company, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        返回分数高于 threshold 的政策位置及其分数
+
+        先通过倒排位图求出候选集，再只对候选政策打分。
+        """
+        positions = self.index.candidates(company, threshold)
+        scores = self.score(company, positions)
+        keep = scores > threshold
+        return positions[keep], scores[keep]
+
+
+class PolicyIndex:
+    """
+    政策资格倒排索引
+
+    把地区、目标行业、目标规模、目标研发水平以及 base_score 分档映射为
+    按位压缩（np.packbits）的政策位置位图。对一个企业画像，先按地区求出
+    可申报集合，再按行业/规模/研发的命中组合与分数下界求交，得到所有
+    可能超过阈值的候选政策；候选集是精确结果的超集，不会漏掉任何政策。
+    """
+
+    def __init__(self, compiled: "CompiledPolicies"):
+        self.size = compiled.size
+        self.all_bits = self._pack(np.ones(self.size, dtype=bool))
+        self.empty_bits = self._pack(np.zeros(self.size, dtype=bool))
+
+        # 地区：非徐汇区政策对所有企业开放
+        self.open_bits = self._pack(~compiled.xuhui_only)
+        self.region_bits = {
+            region: self._pack(compiled.region_codes == code)
+            for region, code in compiled.regions.codes.items()
+        }
+
+        self.industry_bits = self._mask_postings(compiled.industries, compiled.industry_masks)
+        self.scale_bits = self._mask_postings(compiled.scales, compiled.scale_masks)
+        self.rd_bits = self._mask_postings(compiled.rd_levels, compiled.rd_masks)
+
+        # base_score 分档：tier_bits[k] 为 base_score >= k * BASE_TIER_STEP 的政策
+        max_base = float(compiled.base_scores.max()) if self.size else 0.0
+        tier_count = int(np.ceil(max(max_base, 0.0) / BASE_TIER_STEP)) + 1
+        self.tier_bits = [
+            self.all_bits if k == 0 else self._pack(compiled.base_scores >= k * BASE_TIER_STEP)
+            for k in range(tier_count)
+        ]
+
+    def _pack(self, flags: np.ndarray) -> np.ndarray:
+        return np.packbits(flags)
+
+    def _mask_postings(self, vocab: Vocabulary, masks: np.ndarray) -> Dict[str, np.ndarray]:
+        return {
+            value: self._pack((masks >> np.uint64(code)) & np.uint64(1) != 0)
+            for value, code in vocab.codes.items()
+        }
+
+    def _hit_variants(self, postings: Dict[str, np.ndarray], value: str) -> Iterator[Tuple[bool, np.ndarray]]:
+        bits = postings.get(value, self.empty_bits)
+        yield True, bits
+        yield False, ~bits
+
+    def _tier(self, min_base: float) -> Optional[np.ndarray]:
+        """base_score 超过 min_base 的政策位图（保守取下一档，返回超集）"""
+        k = int(np.floor(min_base / BASE_TIER_STEP)) - 1
+        if k <= 0:
+            return self.all_bits
+        if k >= len(self.tier_bits):
+            return None
+        return self.tier_bits[k]
+
+    def candidates(self, company, threshold: float) -> np.ndarray:
+        """返回可能超过阈值的候选政策位置（升序）"""
+        if self.size == 0:
+            return np.empty(0, dtype=np.intp)
+
+        allowed = self.all_bits if company.registration_location == "xuhui" else self.open_bits
+        profile_bonus = sum(_profile_terms(company))
+
+        result = self.empty_bits.copy()
+        for industry_hit, industry in self._hit_variants(self.industry_bits, company.industry_match):
+            for scale_hit, scale in self._hit_variants(self.scale_bits, company.company_scale):
+                for rd_hit, rd in self._hit_variants(self.rd_bits, company.rd_investment):
+                    bonus = (
+                        (INDUSTRY_HIT_BONUS if industry_hit else INDUSTRY_MISS_PENALTY)
+                        + (SCALE_HIT_BONUS if scale_hit else 0.0)
+                        + (RD_HIT_BONUS if rd_hit else RD_MISS_PENALTY)
+                    )
+                    # 贷款类政策的信用扣分只会降低分数，忽略它得到的仍是超集
+                    tier = self._tier(threshold - bonus - profile_bonus)
+                    if tier is None:
+                        continue
+                    result |= allowed & industry & scale & rd & tier
+
+        return np.flatnonzero(np.unpackbits(result, count=self.size))
+
+
+def select_top_k(positions: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    """
+    按数值分数选出 Top-K 的 (位置, 分数)
+
+    与 sorted(..., reverse=True)[:k] 等价：同分时保持政策原有顺序。先用 np.partition
+    求出第 k 大的分数，取所有更高分的政策和最靠前的同分政策，只对这 k 个排序。
+    """
+    if k <= 0 or not len(scores):
+        return []
+    if len(scores) > k:
+        kth = -np.partition(-scores, k - 1)[k - 1]
+        above = np.flatnonzero(scores > kth)
+        tied = np.flatnonzero(scores == kth)[:k - len(above)]
+        chosen = np.concatenate([above, tied])
+    else:
+        chosen = np.arange(len(scores))
+    order = chosen[np.lexsort((chosen, -scores[chosen]))]
+    return list(zip(positions[order].tolist(), scores[order].tolist()))
+
+
+class _ProfileKey:
+    """预计算匹配表中代表某一画像组合的最小企业对象"""
+
+    __slots__ = (
+        "registration_location", "industry_match", "company_scale", "rd_investment",
+        "enterprise_certification", "credit_status", "operating_status", "patents",
+    )
+
+
+class MatchTable:
+    """
+    有限企业画像空间上的全量匹配表
+
+    规则引擎读取的画像字段都来自有限取值：注册地（徐汇/其他）、行业、规模、
+    研发水平（均取政策词表中的取值加一个“词表外”档）、认定类型、信用和经营
+    状态（良好/其他）以及专利分桶。建表时为每个组合算出 TopK 政策位置，存入
+    int32 数组，查询时只需一次下标运算。
+    """
+
+    def __init__(self, compiled: CompiledPolicies, k: int, threshold: float):
+        self.compiled = compiled
+        self.k = k
+        self.threshold = threshold
+
+        self.industry_values = list(compiled.industries.codes) + [_UNKNOWN_VALUE]
+        self.scale_values = list(compiled.scales.codes) + [_UNKNOWN_VALUE]
+        self.rd_values = list(compiled.rd_levels.codes) + [_UNKNOWN_VALUE]
+
+        self.dimensions = [
+            ("registration_location", ["xuhui", _UNKNOWN_VALUE]),
+            ("industry_match", self.industry_values),
+            ("company_scale", self.scale_values),
+            ("rd_investment", self.rd_values),
+            ("enterprise_certification", CERTIFICATION_CLASSES),
+            ("credit_status", ["good", _UNKNOWN_VALUE]),
+            ("operating_status", ["good", _UNKNOWN_VALUE]),
+            ("patents", PATENT_BUCKETS),
+        ]
+        self.row_count = int(np.prod([len(values) for _, values in self.dimensions]))
+        self.positions = np.full((self.row_count, k), -1, dtype=np.int32)
+
+    def build(self) -> "MatchTable":
+        """
+        逐个组合计算 TopK 并写入表中
+
+        行业、规模、研发三个维度决定的部分分数（target_scores）在相邻的行之间相同，
+        只在变化时重新计算；每行在其上累加画像加分、扣除贷款信用分并裁剪，加分顺序
+        与 CompiledPolicies.score 一致，结果与 compiled.match 逐位相同。
+        """
+        compiled = self.compiled
+        sizes = [len(values) for _, values in self.dimensions]
+        open_policies = ~compiled.xuhui_only
+        loan_penalty = np.where(compiled.is_loan, LOAN_CREDIT_PENALTY, 0.0)
+        profile = _ProfileKey()
+        target_key = None
+        for row, digits in enumerate(np.ndindex(*sizes)):
+            for (field, values), digit in zip(self.dimensions, digits):
+                setattr(profile, field, values[digit])
+            if digits[1:4] != target_key:
+                target_key = digits[1:4]
+                target = compiled.target_scores(profile)
+
+            scores = target.copy()
+            for term in _profile_terms(profile):
+                scores += term
+            if profile.credit_status != "good":
+                scores -= loan_penalty
+            np.clip(scores, 0.0, 1.0, out=scores)
+
+            eligible = scores > self.threshold
+            if profile.registration_location != "xuhui":
+                eligible &= open_policies
+            positions = np.flatnonzero(eligible)
+            winners = select_top_k(positions, scores[positions], self.k)
+            self.positions[row, :len(winners)] = [index for index, _ in winners]
+        return self
+
+    def _digits(self, company) -> Iterator[int]:
+        yield 0 if company.registration_location == "xuhui" else 1
+        yield self.compiled.industries.codes.get(company.industry_match, len(self.industry_values) - 1)
+        yield self.compiled.scales.codes.get(company.company_scale, len(self.scale_values) - 1)
+        yield self.compiled.rd_levels.codes.get(company.rd_investment, len(self.rd_values) - 1)
+        certification = company.enterprise_certification
+        yield CERTIFICATION_CLASSES.index(certification) if certification in CERTIFICATION_BONUS else 0
+        yield 0 if company.credit_status == "good" else 1
+        yield 0 if company.operating_status == "good" else 1
+        yield 2 if company.patents >= 5 else (1 if company.patents >= 1 else 0)
+
+    def lookup(self, company, k: int) -> List[int]:
+        """查表返回 TopK 政策位置（k 不得超过建表时的 k）"""
+        if k <= 0:
+            return []
+        row = 0
+        for (_, values), digit in zip(self.dimensions, self._digits(company)):
+            row = row * len(values) + digit
+        top = self.positions[row, :k]
+        return top[top >= 0].tolist()
+
+
+def build_match_table(compiled: CompiledPolicies, k: int, threshold: float) -> MatchTable:
+    """为一份编译结果构建预计算匹配表"""
+    table = MatchTable(compiled, k, threshold).build()
+    logger.info(f"预计算匹配表构建完成，共 {table.row_count} 个画像组合，每组 Top{k}")
+    return table
+
+
+def compile_policies(policies: Sequence[dict]) -> CompiledPolicies:
+    """编译政策列表为列式打分结构"""
+    compiled = CompiledPolicies(policies)
+    logger.info(f"政策列式编译完成，共 {len(compiled)} 条政策")
+    return compiled
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """一次进行中的调用及等待它的请求数"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    合并相同键的并发调用
+
+    同一个键同时只执行一次调用，其余请求等待并共享它的结果（或异常）。
+    调用在独立任务中执行：个别等待者被取消不影响其他等待者，
+    全部等待者都被取消时取消该调用。调用完成后即移除，之后的请求重新执行。
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.calls_total = 0
+        self.executions_total = 0
+        self.coalesced_total = 0
+        self.max_waiters_seen = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """执行 fn()，已有相同键的调用进行中时等待其结果"""
+        self.calls_total += 1
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.create_task(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.executions_total += 1
+        else:
+            self.coalesced_total += 1
+            logger.debug(f"合并进行中的调用 {key[:12]}，等待数 {call.waiters + 1}")
+
+        call.waiters += 1
+        self.max_waiters_seen = max(self.max_waiters_seen, call.waiters)
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                # 没有请求再等待结果：取消调用，之后的相同请求重新执行
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """合并统计：进行中的调用数、当前等待数，以及累计的执行和合并次数"""
+        return {
+            "in_flight": len(self._calls),
+            "waiters": sum(call.waiters for call in self._calls.values()),
+            "calls_total": self.calls_total,
+            "executions_total": self.executions_total,
+            "coalesced_total": self.coalesced_total,
+            "max_waiters_seen": self.max_waiters_seen,
+        }
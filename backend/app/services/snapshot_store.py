@@ -0,0 +1,216 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .policy_record import CompiledPolicy, SymbolTable, compact_policy
+from .rule_engine import CompiledPolicies
+
+logger = logging.getLogger(__name__)
+
+# 文件格式：魔数 + 头部长度(uint64) + JSON 头部，之后是按 8 字节对齐的各数据段
+SNAPSHOT_MAGIC = b"PPSNAP01"
+_HEADER_LENGTH = struct.Struct("<Q")
+_ALIGNMENT = 8
+
+
+def _pad(length: int) -> int:
+    return -length % _ALIGNMENT
+
+
+def _blob(items: Sequence[bytes]) -> Tuple[np.ndarray, bytes]:
+    """把多段字节拼接为一个数据块，返回 (n+1) 个偏移量和数据块"""
+    offsets = np.zeros(len(items) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in items], out=offsets[1:])
+    return offsets, b"".join(items)
+
+
+class _MappedStrings(Sequence):
+    """按偏移量从映射数据块中按需解码的字符串序列"""
+
+    def __init__(self, offsets: np.ndarray, data: memoryview):
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def _raw(self, index: int) -> bytes:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return bytes(self._data[self._offsets[index]:self._offsets[index + 1]])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._raw(index).decode("utf-8")
+
+
+class _MappedRecords(_MappedStrings):
+    """按需解码的政策记录序列，解码为紧凑记录后缓存，每条记录只解析一次"""
+
+    def __init__(self, offsets: np.ndarray, data: memoryview):
+        super().__init__(offsets, data)
+        self._decoded: List[Optional[CompiledPolicy]] = [None] * len(self)
+        self._symbols = SymbolTable()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        record = self._decoded[index] if 0 <= index < len(self) else None
+        if record is None:
+            record = compact_policy(json.loads(self._raw(index)), self._symbols)
+            self._decoded[index] = record
+        return record
+
+
+def write_snapshot_file(
+    path: str,
+    policies: Sequence[Mapping],
+    contents: Sequence[str],
+    policy_ids: Sequence[str],
+    compiled: CompiledPolicies,
+    source_hash: str = ""
+):
+    """
+    把政策快照写为二进制文件
+
+    source_hash 为构建快照所用源数据的内容哈希，写入头部，用于判断快照是否过期。
+    先写临时文件再原子替换，读取方不会看到写了一半的文件。
+    """
+    sections: Dict[str, bytes] = {}
+    layout: Dict[str, dict] = {}
+
+    for name in CompiledPolicies.COLUMN_NAMES:
+        column = np.ascontiguousarray(getattr(compiled, name))
+        sections[name] = column.tobytes()
+        layout[name] = {"dtype": column.dtype.str}
+
+    # 列表字段、政策ID、正文各占一个数据块，均附带偏移量段
+    blobs = {
+        "records": [
+            json.dumps(dict(policy), ensure_ascii=False, separators=(",", ":")).encode("utf-8") for policy in policies
+        ],
+        "policy_ids": [policy_id.encode("utf-8") for policy_id in policy_ids],
+        "contents": [content.encode("utf-8") for content in contents],
+    }
+    for name, items in blobs.items():
+        offsets, data = _blob(items)
+        sections[f"{name}_offsets"] = offsets.tobytes()
+        layout[f"{name}_offsets"] = {"dtype": offsets.dtype.str}
+        sections[name] = data
+        layout[name] = {"dtype": None}
+
+    position = 0
+    for name, data in sections.items():
+        layout[name].update(offset=position, length=len(data))
+        position += len(data) + _pad(len(data))
+
+    header = json.dumps({
+        "count": compiled.size,
+        "source_hash": source_hash,
+        "vocabularies": compiled.vocabularies(),
+        "sections": layout,
+    }, ensure_ascii=False).encode("utf-8")
+    prefix_length = len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size + len(header)
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    # 每个写入方使用独立的临时文件，并发重建时不会写进同一个文件
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(_HEADER_LENGTH.pack(len(header)))
+            f.write(header)
+            f.write(b"\x00" * _pad(prefix_length))
+            for data in sections.values():
+                f.write(data)
+                f.write(b"\x00" * _pad(len(data)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    logger.info(f"政策二进制快照已写入: {path} ({compiled.size} 条)")
+
+
+def _read_header(buffer, path: str) -> Tuple[dict, int]:
+    """校验魔数并解析JSON头部，返回 (头部, 数据段起始位置)"""
+    if buffer[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        raise ValueError(f"不是政策二进制快照文件: {path}")
+    header_start = len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size
+    (header_length,) = _HEADER_LENGTH.unpack_from(buffer, len(SNAPSHOT_MAGIC))
+    header = json.loads(bytes(buffer[header_start:header_start + header_length]))
+    data_start = header_start + header_length
+    return header, data_start + _pad(data_start)
+
+
+def read_snapshot_source_hash(path: str) -> Optional[str]:
+    """只读取快照文件头部中的源数据哈希；文件不存在或损坏时返回None"""
+    try:
+        with open(path, "rb") as f:
+            prefix = f.read(len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size)
+            if len(prefix) < len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size or prefix[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                return None
+            (header_length,) = _HEADER_LENGTH.unpack_from(prefix, len(SNAPSHOT_MAGIC))
+            header = json.loads(f.read(header_length))
+    except (OSError, ValueError, struct.error):
+        return None
+    return header.get("source_hash") or None
+
+
+class SnapshotFile:
+    """
+    内存映射的二进制政策快照
+
+    数值列直接以 np.frombuffer 映射为编译列，无需逐条解析政策；
+    列表字段和正文保持为映射文件中的字节，只在访问时解码。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+
+        header, data_start = _read_header(buffer, path)
+
+        self.count: int = header["count"]
+        self.source_hash: str = header.get("source_hash", "")
+        sections = header["sections"]
+
+        def array(name: str) -> np.ndarray:
+            section = sections[name]
+            dtype = np.dtype(section["dtype"])
+            return np.frombuffer(
+                buffer, dtype=dtype,
+                count=section["length"] // dtype.itemsize,
+                offset=data_start + section["offset"]
+            )
+
+        def data(name: str) -> memoryview:
+            section = sections[name]
+            start = data_start + section["offset"]
+            return buffer[start:start + section["length"]]
+
+        self.compiled = CompiledPolicies.from_columns(
+            header["vocabularies"],
+            {name: array(name) for name in CompiledPolicies.COLUMN_NAMES}
+        )
+        self.policies = _MappedRecords(array("records_offsets"), data("records"))
+        self.policy_ids = _MappedStrings(array("policy_ids_offsets"), data("policy_ids"))
+        self.contents = _MappedStrings(array("contents_offsets"), data("contents"))
@@ -0,0 +1,241 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 可选的向量库实现：chroma（ChromaDB 集合）/ mmap（内存映射的 float16 矩阵文件）
+VECTOR_STORES = ("chroma", "mmap")
+
+# 文件格式：魔数 + 头部长度(uint64) + JSON 头部（条数、维度、政策ID、元数据），之后是按 8 字节对齐的向量矩阵
+VECTOR_FILE_MAGIC = b"PPVEC001"
+_HEADER_LENGTH = struct.Struct("<Q")
+_ALIGNMENT = 8
+
+# 矩阵分块转换为 float32 计算，块大小兼顾缓存命中和临时内存
+_QUERY_BLOCK_ROWS = 1024
+
+
+def _pad(length: int) -> int:
+    return -length % _ALIGNMENT
+
+
+def normalize_vectors(vectors: Any) -> np.ndarray:
+    """按行做 L2 归一化（float32）"""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+class VectorStore(ABC):
+    """
+    政策向量库接口
+
+    query 返回按相似度从高到低排列的 [{'policy_id', 'similarity', 'metadata'}]，
+    相似度为余弦相似度。
+    """
+
+    name = ""
+
+    @abstractmethod
+    def query(self, vector: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        """查询与向量最相似的 top_k 个政策"""
+
+    @abstractmethod
+    def items(self) -> Tuple[List[str], np.ndarray, List[Dict[str, Any]]]:
+        """全部 (政策ID, 向量矩阵, 元数据)，用于导出到其他实现"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """向量条数"""
+
+
+class ChromaVectorStore(VectorStore):
+    """ChromaDB 集合（duckdb+parquet 持久化）"""
+
+    name = "chroma"
+
+    def __init__(self, collection: Any, client: Any = None):
+        self.collection = collection
+        self.client = client
+
+    @classmethod
+    def open(cls, collection_name: str, persist_directory: str = "./chromadb") -> "ChromaVectorStore":
+        import chromadb
+        from chromadb.config import Settings as ChromaSettings
+
+        # 初始化ChromaDB
+        client = chromadb.Client(ChromaSettings(
+            chroma_db_impl="duckdb+parquet",
+            persist_directory=persist_directory
+        ))
+
+        # 获取或创建集合
+        try:
+            collection = client.get_collection(name=collection_name)
+        except Exception:
+            collection = client.create_collection(
+                name=collection_name,
+                metadata={"hnsw:space": "cosine"}
+            )
+        return cls(collection, client)
+
+    def query(self, vector: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        results = self.collection.query(
+            query_embeddings=[np.asarray(vector, dtype=np.float32).tolist()],
+            n_results=top_k,
+            include=["metadatas", "distances"]
+        )
+
+        # 转换结果格式
+        similar_policies = []
+        if results['ids'] and results['ids'][0]:
+            for i, policy_id in enumerate(results['ids'][0]):
+                similarity = 1 - results['distances'][0][i]  # 转换为相似度
+                metadata = results['metadatas'][0][i] if results['metadatas'] else {}
+
+                similar_policies.append({
+                    'policy_id': policy_id,
+                    'similarity': similarity,
+                    'metadata': metadata
+                })
+        return similar_policies
+
+    def items(self) -> Tuple[List[str], np.ndarray, List[Dict[str, Any]]]:
+        data = self.collection.get(include=["embeddings", "metadatas"])
+        metadatas = [metadata or {} for metadata in (data.get("metadatas") or [{}] * len(data["ids"]))]
+        return list(data["ids"]), np.asarray(data["embeddings"], dtype=np.float32), metadatas
+
+    def count(self) -> int:
+        return self.collection.count()
+
+
+def write_vector_file(
+    path: str,
+    policy_ids: Sequence[str],
+    vectors: Any,
+    metadatas: Optional[Sequence[Dict[str, Any]]] = None
+):
+    """
+    把政策向量写为内存映射文件（L2 归一化后以 float16 存储）
+
+    先写临时文件再原子替换，正在映射旧文件的进程不受影响。
+    """
+    matrix = normalize_vectors(vectors).astype(np.float16) if len(policy_ids) else np.zeros((0, 0), np.float16)
+    if len(matrix) != len(policy_ids):
+        raise ValueError(f"向量条数 {len(matrix)} 与政策ID条数 {len(policy_ids)} 不一致")
+
+    header = json.dumps({
+        "count": len(policy_ids),
+        "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        "dtype": matrix.dtype.str,
+        "policy_ids": list(policy_ids),
+        "metadatas": list(metadatas) if metadatas is not None else [{} for _ in policy_ids],
+    }, ensure_ascii=False).encode("utf-8")
+    prefix_length = len(VECTOR_FILE_MAGIC) + _HEADER_LENGTH.size + len(header)
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    # 每个写入方使用独立的临时文件，多个进程同时重建时不会写进同一个文件
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(VECTOR_FILE_MAGIC)
+            f.write(_HEADER_LENGTH.pack(len(header)))
+            f.write(header)
+            f.write(b"\x00" * _pad(prefix_length))
+            f.write(np.ascontiguousarray(matrix).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    logger.info(f"政策向量文件已写入: {path} ({len(policy_ids)} 条)")
+
+
+class MmapVectorStore(VectorStore):
+    """
+    进程内向量库
+
+    向量矩阵以只读方式内存映射，同一台机器上的多个 uvicorn worker 共享同一份页缓存，
+    打开文件无需加载数据。查询分块把 float16 矩阵转换为 float32 后做矩阵向量乘，
+    再用 argpartition 取 top-k（精确检索）。
+    """
+
+    name = "mmap"
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+
+        if buffer[:len(VECTOR_FILE_MAGIC)] != VECTOR_FILE_MAGIC:
+            raise ValueError(f"不是政策向量文件: {path}")
+        header_start = len(VECTOR_FILE_MAGIC) + _HEADER_LENGTH.size
+        (header_length,) = _HEADER_LENGTH.unpack_from(buffer, len(VECTOR_FILE_MAGIC))
+        header = json.loads(bytes(buffer[header_start:header_start + header_length]))
+        data_start = header_start + header_length
+        data_start += _pad(data_start)
+
+        self.dim: int = header["dim"]
+        self.policy_ids: List[str] = header["policy_ids"]
+        self.metadatas: List[Dict[str, Any]] = header["metadatas"]
+        self.matrix = np.frombuffer(
+            buffer, dtype=np.dtype(header["dtype"]), count=header["count"] * self.dim, offset=data_start
+        ).reshape(header["count"], self.dim)
+
+    def scores(self, vector: np.ndarray) -> np.ndarray:
+        """查询向量与全部政策向量的余弦相似度"""
+        query = normalize_vectors(vector)[0]
+        scores = np.empty(len(self.matrix), dtype=np.float32)
+        block = np.empty((min(_QUERY_BLOCK_ROWS, len(self.matrix)), self.dim), dtype=np.float32)
+        for start in range(0, len(self.matrix), _QUERY_BLOCK_ROWS):
+            rows = self.matrix[start:start + _QUERY_BLOCK_ROWS]
+            converted = block[:len(rows)]
+            converted[...] = rows
+            np.dot(converted, query, out=scores[start:start + len(rows)])
+        return scores
+
+    def query(self, vector: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        if not len(self.matrix) or top_k <= 0:
+            return []
+        scores = self.scores(vector)
+        top_k = min(top_k, len(scores))
+        positions = np.argpartition(-scores, top_k - 1)[:top_k]
+        positions = positions[np.argsort(-scores[positions], kind="stable")]
+        return [
+            {
+                'policy_id': self.policy_ids[i],
+                'similarity': float(scores[i]),
+                'metadata': self.metadatas[i]
+            }
+            for i in positions
+        ]
+
+    def items(self) -> Tuple[List[str], np.ndarray, List[Dict[str, Any]]]:
+        return list(self.policy_ids), self.matrix.astype(np.float32), list(self.metadatas)
+
+    def count(self) -> int:
+        return len(self.matrix)
+
+
+def open_vector_store(kind: str, collection_name: str = "", path: str = "") -> VectorStore:
+    """按配置打开向量库"""
+    if kind == "chroma":
+        return ChromaVectorStore.open(collection_name)
+    if kind == "mmap":
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"政策向量文件不存在: {path}（可用 benchmark_vector_store.py --export 从ChromaDB导出）")
+        return MmapVectorStore(path)
+    raise ValueError(f"未知的向量库: {kind}，可选: {', '.join(VECTOR_STORES)}")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+向量推理后端基准测试
+
+在政策语料上比较各推理后端的吞吐、单条延迟，以及与参考模型（sentence-transformers
+全精度）向量的余弦一致性，用于选择 EMBEDDING_BACKEND。
+
+用法：
+    python benchmark_embeddings.py
+    python benchmark_embeddings.py --backends sentence-transformers onnx-int8 --batch-size 16
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from app.services.embedding_backends import EMBEDDING_BACKENDS, load_embedding_model
+
+DEFAULT_CORPUS = project_root.parent / "data" / "real_policies.json"
+DEFAULT_MODEL = "BAAI/bge-large-zh"
+REFERENCE_BACKEND = "sentence-transformers"
+
+
+def load_corpus(path: Path, limit: int) -> list:
+    """读取爬取的政策，标题 + 正文作为测试文本，取前 limit 条；政策不足 limit 条时循环补足"""
+    with open(path, "r", encoding="utf-8") as f:
+        policies = json.load(f)
+    texts = [f"{p.get('title', '')}\n{p.get('content', '')}".strip() for p in policies]
+    texts = [text for text in texts if text]
+    if not texts:
+        raise ValueError(f"语料为空: {path}")
+    return [texts[i % len(texts)] for i in range(limit)]
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def benchmark_backend(backend: str, args, texts: list) -> dict:
+    """测量一个后端的加载时间、吞吐和单条延迟，返回结果及全部语料的向量"""
+    started = time.perf_counter()
+    model = load_embedding_model(
+        backend, args.model, model_path=args.model_path, onnx_dir=args.onnx_dir,
+        max_length=args.max_length, threads=args.threads
+    )
+    load_seconds = time.perf_counter() - started
+    model.encode(texts[:2], batch_size=2)
+
+    # 吞吐：整批编码全部语料
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        vectors = model.encode(texts, batch_size=args.batch_size)
+    batch_seconds = (time.perf_counter() - started) / args.rounds
+
+    # 延迟：逐条编码（与线上单个查询一致）
+    latencies = []
+    for text in texts[:args.latency_samples]:
+        started = time.perf_counter()
+        model.encode([text], batch_size=1)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 2),
+        "throughput": round(len(texts) / batch_seconds, 2),
+        "latency_ms_p50": round(float(np.percentile(latencies, 50)), 2),
+        "latency_ms_p95": round(float(np.percentile(latencies, 95)), 2),
+        "vectors": normalize(vectors),
+    }
+
+
+def agreement(vectors: np.ndarray, reference: np.ndarray, top_k: int) -> dict:
+    """与参考向量的余弦一致性，以及语料内近邻检索结果的重合率"""
+    cosine = np.sum(vectors * reference, axis=1)
+
+    k = min(top_k, len(reference) - 1)
+    overlap = 1.0
+    if k > 0:
+        def neighbours(v: np.ndarray) -> np.ndarray:
+            similarity = v @ v.T
+            np.fill_diagonal(similarity, -np.inf)
+            return np.argsort(-similarity, axis=1)[:, :k]
+
+        ours, theirs = neighbours(vectors), neighbours(reference)
+        overlap = float(np.mean([len(set(a) & set(b)) / k for a, b in zip(ours, theirs)]))
+
+    return {
+        "cosine_mean": round(float(cosine.mean()), 5),
+        "cosine_min": round(float(cosine.min()), 5),
+        f"top{top_k}_overlap": round(overlap, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量推理后端基准测试")
+    parser.add_argument("--backends", nargs="+", default=list(EMBEDDING_BACKENDS), choices=EMBEDDING_BACKENDS)
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS, help="政策语料（爬虫输出的JSON）")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="BGE模型名称")
+    parser.add_argument("--model-path", default="", help="本地模型目录（存在时优先使用）")
+    parser.add_argument("--onnx-dir", default="./models/bge-large-zh-onnx", help="ONNX模型目录")
+    parser.add_argument("--max-length", type=int, default=512)
+    parser.add_argument("--threads", type=int, default=0, help="ONNX Runtime 推理线程数，0 为自动")
+    parser.add_argument("--limit", type=int, default=64, help="测试文本条数")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=3, help="吞吐测试轮数")
+    parser.add_argument("--latency-samples", type=int, default=20, help="单条延迟测试条数")
+    parser.add_argument("--top-k", type=int, default=5, help="近邻重合率的k")
+    parser.add_argument("--output", type=Path, help="把结果写入JSON文件")
+    args = parser.parse_args()
+
+    texts = load_corpus(args.corpus, args.limit)
+    print(f"📚 语料: {args.corpus}，{len(texts)} 条文本")
+
+    # 参考模型总是先测，用于计算一致性
+    backends = [REFERENCE_BACKEND] + [b for b in args.backends if b != REFERENCE_BACKEND]
+    results = []
+    reference = None
+    for backend in backends:
+        print(f"🔍 测试后端 {backend}...")
+        try:
+            result = benchmark_backend(backend, args, texts)
+        except Exception as e:
+            print(f"❌ {backend} 测试失败: {e}")
+            continue
+
+        vectors = result.pop("vectors")
+        if reference is None and backend == REFERENCE_BACKEND:
+            reference = vectors
+        if reference is not None:
+            result.update(agreement(vectors, reference, args.top_k))
+        results.append(result)
+
+    if not results:
+        print("❌ 没有可用的后端")
+        return 1
+
+    print("-" * 100)
+    columns = list(dict.fromkeys(key for result in results for key in result))
+    print("  ".join(f"{column:>16}" for column in columns))
+    for result in results:
+        print("  ".join(f"{str(result.get(column, '-')):>16}" for column in columns))
+
+    if args.output:
+        args.output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"💾 结果已写入: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+向量库基准测试
+
+比较 ChromaDB 与内存映射矩阵（mmap）两种向量库的打开时间、单次查询延迟，
+以及相对 float32 精确检索的召回率，用于选择 VECTOR_STORE。
+
+用法：
+    python benchmark_vector_store.py --count 5000
+    python benchmark_vector_store.py --from-chroma           # 使用已有ChromaDB集合中的向量
+    python benchmark_vector_store.py --export                # 把ChromaDB集合导出为 mmap 向量文件
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from app.services.vector_store import (
+    ChromaVectorStore, MmapVectorStore, normalize_vectors, write_vector_file
+)
+
+DEFAULT_COLLECTION = "policy_embeddings"
+DEFAULT_VECTOR_PATH = "./data/policy_vectors.bin"
+
+
+def synthetic_vectors(count: int, dim: int, seed: int) -> np.ndarray:
+    """按主题聚簇的随机向量，近似真实政策向量的分布"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(count // 50, 1), dim))
+    labels = rng.integers(0, len(centers), count)
+    return normalize_vectors(centers[labels] + 0.5 * rng.standard_normal((count, dim)))
+
+
+def build_chroma(policy_ids: list, vectors: np.ndarray) -> ChromaVectorStore:
+    """在内存中的ChromaDB集合里写入同一批向量"""
+    import chromadb
+
+    collection = chromadb.Client().create_collection(
+        name=f"benchmark_{int(time.time())}", metadata={"hnsw:space": "cosine"}
+    )
+    for start in range(0, len(policy_ids), 1000):
+        collection.add(
+            ids=policy_ids[start:start + 1000],
+            embeddings=vectors[start:start + 1000].tolist()
+        )
+    return ChromaVectorStore(collection)
+
+
+def measure(store, queries: np.ndarray, exact: np.ndarray, top_k: int, policy_ids: list) -> dict:
+    latencies = []
+    recalls = []
+    for query, expected in zip(queries, exact):
+        started = time.perf_counter()
+        results = store.query(query, top_k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        found = {result["policy_id"] for result in results}
+        recalls.append(len(found & {policy_ids[i] for i in expected}) / top_k)
+    return {
+        "latency_ms_p50": round(float(np.percentile(latencies, 50)), 3),
+        "latency_ms_p95": round(float(np.percentile(latencies, 95)), 3),
+        f"recall@{top_k}": round(float(np.mean(recalls)), 4),
+    }
+
+
+def export(args) -> int:
+    store = ChromaVectorStore.open(args.collection)
+    policy_ids, vectors, metadatas = store.items()
+    write_vector_file(args.path, policy_ids, vectors, metadatas)
+    print(f"💾 已从ChromaDB导出 {len(policy_ids)} 条向量: {args.path}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量库基准测试")
+    parser.add_argument("--export", action="store_true", help="把ChromaDB集合导出为 mmap 向量文件后退出")
+    parser.add_argument("--from-chroma", action="store_true", help="使用已有ChromaDB集合中的向量")
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION, help="ChromaDB集合名")
+    parser.add_argument("--path", default=DEFAULT_VECTOR_PATH, help="mmap 向量文件路径（--export 时使用）")
+    parser.add_argument("--count", type=int, default=2000, help="合成向量条数")
+    parser.add_argument("--dim", type=int, default=1024, help="合成向量维度（bge-large-zh 为 1024）")
+    parser.add_argument("--queries", type=int, default=200, help="查询次数")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="把结果写入JSON文件")
+    args = parser.parse_args()
+
+    if args.export:
+        return export(args)
+
+    if args.from_chroma:
+        policy_ids, vectors, _ = ChromaVectorStore.open(args.collection).items()
+        vectors = normalize_vectors(vectors)
+    else:
+        vectors = synthetic_vectors(args.count, args.dim, args.seed)
+        policy_ids = [f"policy_{i}" for i in range(len(vectors))]
+    print(f"📚 向量: {len(vectors)} 条 × {vectors.shape[1]} 维")
+
+    # 查询向量：在库内向量上加噪声；以 float32 精确检索结果为标准答案
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.integers(0, len(vectors), args.queries)
+    queries = normalize_vectors(vectors[picks] + 0.3 * rng.standard_normal((args.queries, vectors.shape[1])))
+    top_k = min(args.top_k, len(vectors))
+    exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :top_k]
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "policy_vectors.bin")
+        write_vector_file(path, policy_ids, vectors)
+        started = time.perf_counter()
+        store = MmapVectorStore(path)
+        open_ms = (time.perf_counter() - started) * 1000
+        results.append({"store": "mmap", "open_ms": round(open_ms, 3), **measure(store, queries, exact, top_k, policy_ids)})
+
+    print("🔍 测试 ChromaDB...")
+    try:
+        started = time.perf_counter()
+        store = build_chroma(policy_ids, vectors)
+        build_ms = (time.perf_counter() - started) * 1000
+        results.append({"store": "chroma", "open_ms": round(build_ms, 3), **measure(store, queries, exact, top_k, policy_ids)})
+    except Exception as e:
+        print(f"❌ ChromaDB 测试失败: {e}")
+
+    print("-" * 90)
+    columns = list(dict.fromkeys(key for result in results for key in result))
+    print("  ".join(f"{column:>16}" for column in columns))
+    for result in results:
+        print("  ".join(f"{str(result.get(column, '-')):>16}" for column in columns))
+    print("（chroma 的 open_ms 为写入内存集合的时间）")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"💾 结果已写入: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+import pytest
+
+from app.services import analysis_cache
+from app.services.analysis_cache import AnalysisCache
+
+ANALYSIS = {"match_score": 0.8, "recommendation": "建议申报"}
+
+
+@pytest.mark.asyncio
+async def test_memory_hit_does_not_use_thread_pool(monkeypatch, tmp_path):
+    cache = AnalysisCache(str(tmp_path / "cache.db"))
+    await cache.set("k1", "p1", "h1", ANALYSIS)
+
+    async def no_thread(*args, **kwargs):
+        raise AssertionError("内存命中不应进入线程池")
+
+    monkeypatch.setattr(analysis_cache.asyncio, "to_thread", no_thread)
+    assert await cache.get("k1", "p1", "h1") == ANALYSIS
+    assert cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_sqlite_tier_and_policy_change(tmp_path):
+    path = str(tmp_path / "cache.db")
+    await AnalysisCache(path).set("k1", "p1", "h1", ANALYSIS)
+
+    # 新实例（进程重启）从SQLite读取
+    cache = AnalysisCache(path)
+    assert await cache.get("k1", "p1", "h1") == ANALYSIS
+
+    # 政策内容变化后旧记录失效
+    assert await cache.get("k2", "p1", "h2") is None
+    assert await cache.get("k1", "p1", "h1") is None
+    assert await AnalysisCache(path).get("k1", "p1", "h1") is None
@@ -0,0 +1,29 @@
+import os
+import threading
+import time
+
+from app.services import embedding_backends
+
+
+def test_concurrent_loaders_export_onnx_once(monkeypatch, tmp_path):
+    exports = []
+
+    def export(source, output_dir, quantize):
+        exports.append(source)
+        time.sleep(0.2)
+        open(os.path.join(output_dir, embedding_backends._ONNX_FILE), "wb").close()
+
+    monkeypatch.setattr(embedding_backends, "export_onnx_model", export)
+    monkeypatch.setattr(embedding_backends, "OnnxEmbeddingModel", lambda *args, **kwargs: object())
+
+    onnx_dir = str(tmp_path / "onnx")
+    threads = [
+        threading.Thread(target=embedding_backends.load_embedding_model, args=("onnx", "bge"), kwargs={"onnx_dir": onnx_dir})
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert exports == ["bge"]
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from app.services.embedding_cache import EmbeddingCache
+
+
+@pytest.mark.asyncio
+async def test_memory_hit_is_not_blocked_by_sqlite_io(tmp_path):
+    cache = EmbeddingCache("bge", str(tmp_path / "embeddings.db"))
+    await cache.set("人工智能", np.ones(4, dtype=np.float32))
+
+    # 另一个线程正在进行SQLite读写时，内存命中不需要等待
+    with cache._db_lock:
+        assert np.array_equal(await cache.get("人工智能"), np.ones(4, dtype=np.float32))
+
+
+@pytest.mark.asyncio
+async def test_sqlite_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    await EmbeddingCache("bge", path).set("人工智能", np.arange(4, dtype=np.float32))
+
+    cache = EmbeddingCache("bge", path)
+    assert np.array_equal(await cache.get("人工智能"), np.arange(4, dtype=np.float32))
+    assert cache.stats()["entries"] == 1
+    assert await EmbeddingCache("other", path).get("人工智能") is None
@@ -0,0 +1,39 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from app.services.embedding_worker import EmbeddingWorker
+
+
+class _BlockingModel:
+    """推理在释放前一直阻塞，模拟关闭时正在进行的一批推理"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def encode(self, texts, batch_size):
+        self.started.set()
+        self.release.wait(5)
+        return np.zeros((len(texts), 4), dtype=np.float32)
+
+
+@pytest.mark.asyncio
+async def test_stop_fails_in_flight_and_queued_requests():
+    model = _BlockingModel()
+    worker = EmbeddingWorker(model, max_batch_size=2, max_wait=0.0)
+    worker.start()
+
+    in_flight = [asyncio.create_task(worker.encode(f"查询{i}")) for i in range(2)]
+    await asyncio.to_thread(model.started.wait, 5)
+    queued = asyncio.create_task(worker.encode("排队中的查询"))
+    await asyncio.sleep(0)
+
+    await worker.stop()
+    results = await asyncio.wait_for(asyncio.gather(*in_flight, queued, return_exceptions=True), 1.0)
+    model.release.set()
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert not worker.running
@@ -0,0 +1,40 @@
+from app.services.lexical_index import LexicalIndex
+
+DOCS = {
+    "p1": "人工智能产业扶持政策 人工智能 大数据",
+    "p2": "生物医药创新专项 生物医药",
+    "p3": "专精特新小巨人企业奖励 专精特新",
+    "p4": "集成电路设计企业补贴 集成电路",
+}
+
+
+def _scores(index: LexicalIndex, query: str) -> dict:
+    return {doc_id: round(score, 4) for doc_id, score in index.search(query, 100)}
+
+
+def test_reindexing_keeps_doc_arrays_bounded():
+    index = LexicalIndex()
+    for _ in range(200):
+        for doc_id, text in DOCS.items():
+            index.upsert(doc_id, [(text, 1.0)])
+
+    assert len(index) == len(DOCS)
+    assert len(index._doc_ids) <= len(DOCS) * (1 + index.compact_ratio) + 1
+
+    fresh = LexicalIndex()
+    for doc_id, text in DOCS.items():
+        fresh.upsert(doc_id, [(text, 1.0)])
+    for query in ("人工智能 补贴", "专精特新", "生物医药创新"):
+        assert _scores(index, query) == _scores(fresh, query)
+
+
+def test_removed_documents_are_not_returned():
+    index = LexicalIndex()
+    for doc_id, text in DOCS.items():
+        index.upsert(doc_id, [(text, 1.0)])
+    index.remove("p1")
+    index.compact()
+
+    assert "p1" not in index
+    assert "p1" not in _scores(index, "人工智能")
+    assert _scores(index, "集成电路")["p4"] > 0
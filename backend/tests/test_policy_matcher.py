@@ -0,0 +1,234 @@
+import pytest
+
+from app.database import Policy
+from app.models.schemas import CompanyProfile, ScoreSource
+from app.services import policy_matcher
+from app.services.policy_matcher import PolicyMatcherService
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return list(self._rows)
+
+
+class _Session:
+    """只返回给定政策的数据库会话"""
+
+    def __init__(self, rows):
+        self._rows = rows
+        self.statements = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return _Result(self._rows)
+
+
+def _policy(policy_id: str, name: str, tags, region: str = "徐汇区") -> Policy:
+    return Policy(
+        id=policy_id,
+        policy_name=name,
+        region=region,
+        industry_tags=tags,
+        requirements=["注册在徐汇区"],
+        support_type="grant",
+        max_amount=100.0,
+        deadline=None,
+        content=f"{name}，支持{'、'.join(tags)}企业",
+        source_url=f"https://example.com/{policy_id}",
+        is_active=True,
+    )
+
+
+@pytest.fixture
+def company():
+    return CompanyProfile(
+        company_name="测试科技有限公司",
+        industry_match="ai-tech",
+        company_scale="under-5m",
+        rd_investment="3-5",
+        patents=3,
+    )
+
+
+@pytest.fixture
+def service(monkeypatch):
+    svc = PolicyMatcherService()
+    # 不在测试中预热真实的向量库和模型
+    monkeypatch.setattr(svc, "start_warm_up", lambda: None)
+    return svc
+
+
+@pytest.mark.asyncio
+async def test_match_degrades_to_rule_scoring_before_warm_up(monkeypatch, service, company):
+    policies = [
+        _policy("p1", "人工智能产业扶持政策", ["人工智能", "大数据"]),
+        _policy("p2", "生物医药创新专项", ["生物医药"]),
+    ]
+    session = _Session(policies)
+    monkeypatch.setattr(policy_matcher, "AsyncSessionLocal", lambda: session)
+
+    async def fail_deepseek(*args, **kwargs):
+        raise AssertionError("降级路径不应调用DeepSeek")
+
+    monkeypatch.setattr(service, "_post_completion", fail_deepseek)
+
+    assert not service.ready
+    matches = await service.match_policies(company, top_k=5, min_score=0.0)
+
+    assert len(session.statements) == 1
+    assert matches
+    assert {m.score_source for m in matches} == {ScoreSource.RULE}
+    assert matches[0].policy_id == "p1"
+
+
+@pytest.mark.asyncio
+async def test_lexical_index_retries_failed_first_sync(monkeypatch, service, company):
+    policies = [
+        _policy("p1", "人工智能产业扶持政策", ["人工智能", "大数据"]),
+        _policy("p2", "生物医药创新专项", ["生物医药"]),
+    ]
+    sessions = iter([None, _Session(policies)])
+
+    def session_factory():
+        session = next(sessions)
+        if session is None:
+            raise ConnectionError("数据库未就绪")
+        return session
+
+    monkeypatch.setattr(policy_matcher, "AsyncSessionLocal", session_factory)
+    monkeypatch.setattr(policy_matcher.settings, "LEXICAL_INDEX_RETRY_INTERVAL", 0.0)
+
+    await service._warm_component("lexical_index", service.refresh_lexical_index)
+    assert service.components["lexical_index"] == "failed"
+
+    service._schedule_lexical_refresh()
+    await service._lexical_refresh_task
+
+    assert service.components["lexical_index"] == "ready"
+    assert len(service.lexical_index) == 2
+    assert service._lexical_search(company, 5)[0]["policy_id"] == "p1"
+
+
+def test_batches_fit_the_analysis_deadline(monkeypatch, service, company):
+    policies = [_policy(f"p{i}", f"科技创新政策{i}", ["人工智能"]) for i in range(12)]
+    positions = list(range(len(policies)))
+    monkeypatch.setattr(policy_matcher.settings, "MATCH_ANALYSIS_OUTPUT_TOKENS", 600)
+    monkeypatch.setattr(policy_matcher.settings, "MATCH_ANALYSIS_OUTPUT_TOKENS_PER_SECOND", 40.0)
+    monkeypatch.setattr(policy_matcher.settings, "MATCH_ANALYSIS_CONCURRENCY", 2)
+
+    # 15秒内只能生成一个政策的预留输出
+    monkeypatch.setattr(policy_matcher.settings, "MATCH_ANALYSIS_DEADLINE", 15.0)
+    groups = service._plan_batches(company, policies, positions)
+    assert [len(group) for group in groups] == [1] * 12
+
+    monkeypatch.setattr(policy_matcher.settings, "MATCH_ANALYSIS_DEADLINE", 60.0)
+    groups = service._plan_batches(company, policies, positions)
+    assert max(len(group) for group in groups) == 4
+    assert sorted(i for group in groups for i in group) == positions
+
+    # 政策少时分散到并发请求中
+    groups = service._plan_batches(company, policies, positions[:4])
+    assert [len(group) for group in groups] == [2, 2]
+
+
+def test_cascade_prunes_irrelevant_policies(service, company):
+    relevant = _policy("p1", "人工智能产业扶持政策", ["人工智能"])
+    region_only = _policy("p2", "徐汇区企业服务政策", ["商贸"])
+    irrelevant = _policy("p3", "餐饮业纾困补贴", ["餐饮"], region="全国")
+
+    llm_policies, rule_matches = service._cascade(
+        company, [irrelevant, region_only, relevant], min_score=0.3, llm_budget=1
+    )
+
+    assert [policy.id for policy in llm_policies] == ["p1"]
+    assert [match.policy_id for match in rule_matches] == ["p2"]
+
+
+@pytest.mark.asyncio
+async def test_stream_summary_ranks_like_match_policies(monkeypatch, tmp_path, service, company):
+    llm_policies = [_policy(f"p{i}", f"人工智能专项{i}", ["人工智能"]) for i in range(3)]
+    rule_matches = [
+        service._build_match(policy, service._fallback_analysis(company, policy))
+        for policy in (_policy("r1", "人工智能人才政策", ["人工智能"]), _policy("r2", "大数据应用政策", ["大数据"]))
+    ]
+
+    async def select_candidates(*args):
+        return llm_policies, rule_matches
+
+    async def completion(prompt, max_tokens):
+        # AI分数与规则分数相同，排序只由同分规则决定
+        return '{"match_score": 0.9, "matched_requirements": [], "missing_requirements": [], "recommendation": "建议申报"}'
+
+    monkeypatch.setattr(service, "_select_candidates", select_candidates)
+    monkeypatch.setattr(service, "_post_completion", completion)
+    monkeypatch.setattr(policy_matcher.settings, "MATCH_ANALYSIS_BATCH_ENABLED", False)
+    service.analysis_cache = policy_matcher.AnalysisCache(str(tmp_path / "analysis_cache.db"))
+
+    matches = await service.match_policies(company, top_k=4, min_score=0.3)
+    events = [event async for event in service.stream_matches(company, top_k=4, min_score=0.3)]
+
+    assert events[-1][0] == "summary"
+    assert [m.policy_id for m in events[-1][1]] == [m.policy_id for m in matches]
+    assert [m.policy_id for m in matches] == ["p0", "p1", "p2", "r1"]
+
+
+@pytest.mark.asyncio
+async def test_invalid_analysis_reply_is_not_cached(monkeypatch, tmp_path, service, company):
+    policy = _policy("p1", "人工智能产业扶持政策", ["人工智能"])
+    replies = iter([
+        '{"match_score": "高", "recommendation": "建议申报"}',
+        '{"match_score": 0.9, "matched_requirements": [], "missing_requirements": [], "recommendation": "建议申报"}',
+    ])
+
+    async def completion(prompt, max_tokens):
+        return next(replies)
+
+    monkeypatch.setattr(service, "_post_completion", completion)
+    service.analysis_cache = policy_matcher.AnalysisCache(str(tmp_path / "analysis_cache.db"))
+
+    fallback = await service._call_deepseek_api(company, policy)
+    assert fallback == service._fallback_analysis(company, policy)
+    cache_key, policy_hash = service._analysis_cache_key(company, policy)
+    assert await service.analysis_cache.get(cache_key, "p1", policy_hash) is None
+
+    analysis = await service._call_deepseek_api(company, policy)
+    assert analysis["match_score"] == 0.9
+
+
+@pytest.mark.asyncio
+async def test_rule_tier_ranks_below_llm_analysed_policies(monkeypatch, tmp_path, service, company):
+    llm_policy = _policy("p1", "人工智能专项", ["人工智能"])
+    rule_matches = [service._build_match(
+        _policy("r1", "人工智能人才政策", ["人工智能"]),
+        dict(service._fallback_analysis(company, llm_policy), match_score=0.8)
+    )]
+
+    async def select_candidates(*args):
+        return [llm_policy], rule_matches
+
+    async def completion(prompt, max_tokens):
+        return '{"match_score": 0.5, "matched_requirements": [], "missing_requirements": [], "recommendation": "可以申报"}'
+
+    monkeypatch.setattr(service, "_select_candidates", select_candidates)
+    monkeypatch.setattr(service, "_post_completion", completion)
+    monkeypatch.setattr(policy_matcher.settings, "MATCH_ANALYSIS_BATCH_ENABLED", False)
+    service.analysis_cache = policy_matcher.AnalysisCache(str(tmp_path / "analysis_cache.db"))
+
+    matches = await service.match_policies(company, top_k=5, min_score=0.3)
+    events = [event async for event in service.stream_matches(company, top_k=5, min_score=0.3)]
+
+    # 规则分更高的候选也排在AI实际分析过的政策之后
+    assert [(m.policy_id, m.score_source) for m in matches] == [("p1", ScoreSource.LLM), ("r1", ScoreSource.RULE)]
+    assert [m.policy_id for m in events[-1][1]] == ["p1", "r1"]
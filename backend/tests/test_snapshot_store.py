@@ -0,0 +1,76 @@
+import os
+import threading
+
+from app.services.policy_snapshot import build_snapshot, open_snapshot, save_snapshot
+from app.services.snapshot_store import read_snapshot_source_hash
+
+POLICIES = [
+    {
+        "policy_id": "XH001",
+        "policy_name": "人工智能产业扶持政策",
+        "region": "徐汇区",
+        "industry_tags": ["人工智能"],
+        "requirements": ["注册在徐汇区"],
+        "support_type": "grant",
+        "max_amount": 100.0,
+        "deadline": None,
+        "content": "支持人工智能企业",
+        "source_url": "https://example.com/XH001",
+        "target_industries": ["ai"],
+        "target_scale": ["small"],
+        "target_rd": ["medium"],
+        "base_score": 0.8,
+    },
+]
+
+
+def test_snapshot_header_records_source_hash(tmp_path):
+    path = str(tmp_path / "policies.snapshot")
+    assert read_snapshot_source_hash(path) is None
+
+    snapshot = build_snapshot(POLICIES)
+    save_snapshot(snapshot, path, "sha256:abc")
+
+    assert read_snapshot_source_hash(path) == "sha256:abc"
+    mapped = open_snapshot(path)
+    assert list(mapped.policy_ids) == ["XH001"]
+    assert mapped.content(0) == "支持人工智能企业"
+
+    (tmp_path / "broken.snapshot").write_bytes(b"not a snapshot")
+    assert read_snapshot_source_hash(str(tmp_path / "broken.snapshot")) is None
+
+
+def test_concurrent_writers_publish_a_complete_snapshot(tmp_path):
+    path = str(tmp_path / "policies.snapshot")
+    snapshots = [
+        build_snapshot([dict(POLICIES[0], policy_id=f"XH{i:03d}", content="政策正文" * 2000) for i in range(n)])
+        for n in (50, 80)
+    ]
+    barrier = threading.Barrier(len(snapshots) * 4)
+    errors = []
+
+    def write(snapshot, source_hash):
+        barrier.wait()
+        try:
+            save_snapshot(snapshot, path, source_hash)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [
+        threading.Thread(target=write, args=(snapshot, f"sha256:{i}"))
+        for _ in range(4)
+        for i, snapshot in enumerate(snapshots)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    # 最终文件必须是某一个写入方的完整快照，且头部哈希与内容对应
+    source_hash = read_snapshot_source_hash(path)
+    expected = snapshots[int(source_hash.split(":")[1])]
+    mapped = open_snapshot(path)
+    assert list(mapped.policy_ids) == list(expected.policy_ids)
+    assert mapped.content(len(mapped) - 1) == expected.content(len(expected) - 1)
+    assert sorted(os.listdir(tmp_path)) == ["policies.snapshot"]
@@ -0,0 +1,36 @@
+import os
+import threading
+
+import numpy as np
+
+from app.services.vector_store import MmapVectorStore, write_vector_file
+
+
+def test_concurrent_writers_publish_a_complete_vector_file(tmp_path):
+    path = str(tmp_path / "policy_vectors.bin")
+    rng = np.random.default_rng(0)
+    versions = [
+        ([f"v{version}-p{i}" for i in range(n)], rng.normal(size=(n, 256)))
+        for version, n in enumerate((300, 500))
+    ]
+    barrier = threading.Barrier(len(versions) * 4)
+    errors = []
+
+    def write(policy_ids, vectors):
+        barrier.wait()
+        try:
+            write_vector_file(path, policy_ids, vectors)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=version) for _ in range(4) for version in versions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    store = MmapVectorStore(path)
+    policy_ids, vectors = next(version for version in versions if version[0] == store.policy_ids)
+    assert store.query(vectors[-1], 1)[0]["policy_id"] == policy_ids[-1]
+    assert sorted(os.listdir(tmp_path)) == ["policy_vectors.bin"]
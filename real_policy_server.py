@@ -21,6 +21,9 @@ import time
 
 # 导入真实的爬取模块
 from real_crawler import RealPolicyCrawler
+from backend.app.services.json_codec import FastJSONResponse, RawJSON, dumps, dumps_members, join_object
+from backend.app.services.policy_record import compact_policies
+from backend.app.services.policy_stats import PolicyStats
 
 app = FastAPI(
     title="PolicyPilot AI Chat Test",
@@ -42,9 +45,27 @@ DEEPSEEK_API_KEY = "sk-e51ff57edcae48a2b5b462d9f8abcd49"
 DEEPSEEK_BASE_URL = "https://api.deepseek.com/v1"
 DEEPSEEK_MODEL = "deepseek-chat"
 
-# 真实政策数据库（将从爬取中更新）
+# 真实政策数据库（将从爬取中更新），政策以紧凑记录（CompiledPolicy）保存，
+# 标签、枚举值和 target_* 列表在政策间共享
 POLICIES_DATABASE = []
 
+# 政策统计信息（每次更新政策数据库时重新计算）
+POLICY_STATS = PolicyStats([])
+
+# 每条政策预编码的JSON成员片段（不含花括号），与 POLICIES_DATABASE 一一对应
+POLICY_FRAGMENTS: List[bytes] = []
+
+# 不依赖企业信息的增强政策列表，首次请求时编码，更新政策数据库时清空
+ENHANCED_POLICIES_CACHE: Dict[bool, RawJSON] = {}
+
+def set_policies_database(policies):
+    """替换政策数据库，重新计算统计信息和JSON片段"""
+    global POLICIES_DATABASE, POLICY_STATS, POLICY_FRAGMENTS, ENHANCED_POLICIES_CACHE
+    POLICIES_DATABASE = compact_policies(policies)
+    POLICY_STATS = PolicyStats(POLICIES_DATABASE)
+    POLICY_FRAGMENTS = [dumps_members(policy) for policy in POLICIES_DATABASE]
+    ENHANCED_POLICIES_CACHE = {}
+
 # 初始化真实爬取器
 real_crawler = RealPolicyCrawler()
 
@@ -136,23 +157,23 @@ async def health_check():
 @app.get("/api/v1/policies/count")
 async def get_policy_count():
     """获取政策统计信息"""
-    active_policies = len([p for p in POLICIES_DATABASE if datetime.strptime(p["deadline"], "%Y-%m-%d") > datetime.now()])
+    stats = POLICY_STATS
     
     return {
         "success": True,
         "data": {
-            "total_policies": len(POLICIES_DATABASE),
-            "active_policies": active_policies,
+            "total_policies": stats.total,
+            "active_policies": stats.active_count(),
             "by_region": {
-                "xuhui": len([p for p in POLICIES_DATABASE if p["region"] == "徐汇区"]),
-                "shanghai": len([p for p in POLICIES_DATABASE if p["region"] == "上海市"]),
-                "national": len([p for p in POLICIES_DATABASE if p["region"] == "全国"])
+                "xuhui": stats.by_region["徐汇区"],
+                "shanghai": stats.by_region["上海市"],
+                "national": stats.by_region["全国"]
             },
             "by_type": {
-                "grant": len([p for p in POLICIES_DATABASE if p["support_type"] == "grant"]),
-                "subsidy": len([p for p in POLICIES_DATABASE if p["support_type"] == "subsidy"]),
-                "tax": len([p for p in POLICIES_DATABASE if p["support_type"] == "tax"]),
-                "voucher": len([p for p in POLICIES_DATABASE if p["support_type"] == "voucher"])
+                "grant": stats.by_type["grant"],
+                "subsidy": stats.by_type["subsidy"],
+                "tax": stats.by_type["tax"],
+                "voucher": stats.by_type["voucher"]
             }
         }
     }
@@ -160,25 +181,23 @@ async def get_policy_count():
 @app.get("/api/v1/policies")
 async def get_policies(limit: int = 10, region: Optional[str] = None):
     """获取政策列表"""
-    policies = POLICIES_DATABASE
+    positions = range(len(POLICIES_DATABASE))
     
     if region:
-        policies = [p for p in policies if p["region"] == region]
+        positions = [i for i in positions if POLICIES_DATABASE[i]["region"] == region]
     
-    return {
+    return FastJSONResponse({
         "success": True,
         "data": {
-            "policies": policies[:limit],
-            "total": len(policies),
-            "filtered": len(policies) if region else len(POLICIES_DATABASE)
+            "policies": [join_object(POLICY_FRAGMENTS[i]) for i in positions[:limit]],
+            "total": len(positions),
+            "filtered": len(positions) if region else len(POLICIES_DATABASE)
         }
-    }
+    })
 
 @app.post("/api/v1/crawler/refresh")
 async def refresh_crawled_data():
     """刷新爬取的政策数据"""
-    global POLICIES_DATABASE
-    
     try:
         print("🔄 开始刷新政策数据...")
         
@@ -189,8 +208,9 @@ async def refresh_crawled_data():
         new_policies = await crawl_policies()
         
         # 更新政策数据库
-        POLICIES_DATABASE = new_policies
+        set_policies_database(new_policies)
         new_count = len(POLICIES_DATABASE)
+        stats = POLICY_STATS
         
         # 计算统计信息
         refresh_stats = {
@@ -198,19 +218,19 @@ async def refresh_crawled_data():
             "new_policies": max(0, new_count - old_count),
             "refresh_time": datetime.now().isoformat(),
             "by_region": {
-                "xuhui": len([p for p in POLICIES_DATABASE if p["region"] == "徐汇区"]),
-                "shanghai": len([p for p in POLICIES_DATABASE if p["region"] == "上海市"]),
-                "national": len([p for p in POLICIES_DATABASE if p["region"] == "全国"])
+                "xuhui": stats.by_region["徐汇区"],
+                "shanghai": stats.by_region["上海市"],
+                "national": stats.by_region["全国"]
             },
             "by_type": {
-                "grant": len([p for p in POLICIES_DATABASE if p["support_type"] == "grant"]),
-                "subsidy": len([p for p in POLICIES_DATABASE if p["support_type"] == "subsidy"]),
-                "tax": len([p for p in POLICIES_DATABASE if p["support_type"] == "tax"]),
-                "voucher": len([p for p in POLICIES_DATABASE if p["support_type"] == "voucher"])
+                "grant": stats.by_type["grant"],
+                "subsidy": stats.by_type["subsidy"],
+                "tax": stats.by_type["tax"],
+                "voucher": stats.by_type["voucher"]
             },
             "by_update_time": {
-                "today": len([p for p in POLICIES_DATABASE if p.get("last_updated", "").startswith("2024-06-12")]),
-                "this_week": len([p for p in POLICIES_DATABASE if p.get("last_updated", "").startswith("2024-06")])
+                "today": stats.updated_by_day["2024-06-12"],
+                "this_week": stats.updated_by_month["2024-06"]
             }
         }
         
@@ -232,7 +252,7 @@ async def refresh_crawled_data():
         
         # 如果刷新失败，确保至少有备用数据
         if not POLICIES_DATABASE:
-            POLICIES_DATABASE = get_fallback_policies()
+            set_policies_database(get_fallback_policies())
             print("⚠️ 已加载备用政策数据")
         
         raise HTTPException(
@@ -480,17 +500,17 @@ async def match_policies_for_company(company_profile: CompanyProfile):
     """为企业匹配政策并计算匹配度"""
     try:
         matched_policies = []
+        company_info = company_profile.dict()
         
-        for policy in POLICIES_DATABASE:
+        for policy, fragment in zip(POLICIES_DATABASE, POLICY_FRAGMENTS):
             # 计算匹配度
-            match_score = calculate_policy_match(policy, company_profile.dict())
+            match_score = calculate_policy_match(policy, company_info)
             
             # 生成推荐建议
-            recommendation = generate_match_recommendation(policy, company_profile.dict(), match_score)
+            recommendation = generate_match_recommendation(policy, company_info, match_score)
             
-            # 创建匹配结果
+            # 创建匹配结果（政策字段复用预编码片段，只编码随企业变化的部分）
             matched_policy = {
-                **policy,
                 'match_score': match_score,
                 'recommendation': recommendation,
                 'matched_requirements': [],
@@ -519,58 +539,69 @@ async def match_policies_for_company(company_profile: CompanyProfile):
                         # 默认为匹配
                         matched_policy['matched_requirements'].append(req)
             
-            matched_policies.append(matched_policy)
+            matched_policies.append((match_score, join_object(fragment, dumps_members(matched_policy))))
         
         # 按匹配度排序
-        matched_policies.sort(key=lambda x: x['match_score'], reverse=True)
+        matched_policies.sort(key=lambda x: x[0], reverse=True)
+        scores = [score for score, _ in matched_policies]
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "message": f"成功匹配 {len(matched_policies)} 个政策",
             "data": {
-                "company_profile": company_profile.dict(),
-                "matched_policies": matched_policies,
+                "company_profile": company_info,
+                "matched_policies": [entry for _, entry in matched_policies],
                 "total_policies": len(matched_policies),
-                "high_match_count": len([p for p in matched_policies if p['match_score'] >= 0.8]),
-                "medium_match_count": len([p for p in matched_policies if 0.6 <= p['match_score'] < 0.8]),
-                "low_match_count": len([p for p in matched_policies if p['match_score'] < 0.6])
+                "high_match_count": len([score for score in scores if score >= 0.8]),
+                "medium_match_count": len([score for score in scores if 0.6 <= score < 0.8]),
+                "low_match_count": len([score for score in scores if score < 0.6])
             }
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"政策匹配失败: {str(e)}")
 
+def encode_enhanced_policies(has_company_data: bool) -> RawJSON:
+    """编码增强政策列表（政策字段复用预编码片段）"""
+    enhanced_policies = []
+    
+    for policy, fragment in zip(POLICIES_DATABASE, POLICY_FRAGMENTS):
+        enhanced_policy = {
+            'match_score': None,
+            'recommendation': None
+        }
+        
+        # 如果没有企业信息，使用基础分数
+        if not has_company_data:
+            enhanced_policy['match_score'] = policy.get('base_score', 0.6)
+            enhanced_policy['recommendation'] = "请完善企业信息以获得更精准的匹配度评估。"
+        
+        enhanced_policies.append((enhanced_policy['match_score'], join_object(fragment, dumps_members(enhanced_policy))))
+    
+    # 按基础分数排序（提供企业信息时匹配度均为空，保持原顺序）
+    if not has_company_data:
+        enhanced_policies.sort(key=lambda x: x[0], reverse=True)
+    
+    return RawJSON(dumps([entry for _, entry in enhanced_policies]))
+
 @app.get("/api/v1/policies/enhanced")
 async def get_enhanced_policies(company_name: Optional[str] = None):
     """获取增强的政策列表，如果提供企业信息则计算匹配度"""
     try:
-        enhanced_policies = []
-        
-        for policy in POLICIES_DATABASE:
-            enhanced_policy = {
-                **policy,
-                'match_score': None,
-                'recommendation': None
-            }
-            
-            # 如果没有企业信息，使用基础分数
-            if not company_name:
-                enhanced_policy['match_score'] = policy.get('base_score', 0.6)
-                enhanced_policy['recommendation'] = "请完善企业信息以获得更精准的匹配度评估。"
-            
-            enhanced_policies.append(enhanced_policy)
+        has_company_data = bool(company_name)
         
-        # 按基础分数排序
-        enhanced_policies.sort(key=lambda x: x.get('match_score', 0), reverse=True)
+        # 列表内容只取决于政策数据库和是否提供企业信息，编码一次后复用
+        if has_company_data not in ENHANCED_POLICIES_CACHE:
+            ENHANCED_POLICIES_CACHE[has_company_data] = encode_enhanced_policies(has_company_data)
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "data": {
-                "policies": enhanced_policies,
-                "total": len(enhanced_policies),
-                "has_company_data": bool(company_name)
+                "policies": ENHANCED_POLICIES_CACHE[has_company_data],
+                "total": len(POLICIES_DATABASE),
+                "has_company_data": has_company_data
             }
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取政策列表失败: {str(e)}")
@@ -655,14 +686,13 @@ def get_fallback_policies():
 # 初始化政策数据库
 async def initialize_policies_database():
     """初始化政策数据库"""
-    global POLICIES_DATABASE
     try:
         print("🔄 初始化政策数据库...")
-        POLICIES_DATABASE = await crawl_policies()
+        set_policies_database(await crawl_policies())
         print(f"✅ 政策数据库初始化完成，共 {len(POLICIES_DATABASE)} 条政策")
     except Exception as e:
         print(f"❌ 初始化失败: {e}")
-        POLICIES_DATABASE = get_fallback_policies()
+        set_policies_database(get_fallback_policies())
         print(f"⚠️ 使用备用数据，共 {len(POLICIES_DATABASE)} 条政策")
 
 if __name__ == "__main__":